@@ -0,0 +1,276 @@
+import asyncio
+import json
+import math
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, parse_qs
+import numpy as np
+import pandas as pd
+from filter_index import FILTERS
+from cube import CUBE_DIMS
+from planner import AggregationPlanner, aggregate
+from figure_cache import selection_key
+from utils import kpis, new_vs_repeat_by_month
+from dataset import load_dataset, select, filter_columns
+from time_index import WINDOWS, date_bounds, window
+
+# Local JSON API over the dashboard's numbers. One process loads the dataset once; every client
+# shares it, the per-filter aggregate memo, the response cache and in-flight computations.
+#   GET /kpis                   utils.kpis for the filtered rows
+#   GET /revenue/<dimension>    revenue by department, city, category, ... (any cube dimension)
+#   GET /trend                  monthly revenue
+#   GET /new-vs-repeat          monthly new-customer share
+#   GET /filters                filter keys and their labels
+#   GET /stats                  cache and coalescing counters
+# Filters use the sidebar's keys as repeated query parameters: /kpis?city=Dubai&city=Sharjah
+# Date ranges: window=Month to date (the sidebar's windows) or start=2025-09-01&end=2025-09-30
+#   python api.py serve [--port 8765]
+#   python api.py bench         p50/p99 latency of cold and cached filter sets
+
+class ApiError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+def _num(v):
+    if v is None:
+        return None
+    v = v.item() if isinstance(v, np.generic) else v
+    return None if isinstance(v, float) and not math.isfinite(v) else v
+
+def _series(s: pd.Series) -> list:
+    return [{'label': str(k), 'value': _num(v)} for k, v in s.items()]
+
+class Engine:
+    """Shared state behind the API: the dataset, a memo per filter set and a response LRU.
+
+    Identical requests that arrive while one is being computed wait for that computation instead
+    of starting their own. Computations run on a thread pool so the event loop keeps serving
+    cached responses meanwhile.
+    """
+
+    def __init__(self, data: dict, workers: int = 4, max_responses: int = 2048, max_views: int = 64):
+        self.data = data
+        self.col_map = data['col_map']
+        self.filter_cols = dict(zip([key for key, _ in FILTERS], filter_columns(data['frame'], self.col_map)))
+        odt = self.col_map.get('order_datetime')
+        self.time_col = odt if odt in data['frame'].columns else None
+        self.date_bounds = date_bounds(data['frame'], odt) if self.time_col else (None, None)
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="api")
+        self.max_responses = max_responses
+        self.max_views = max_views
+        self._responses = OrderedDict()
+        self._inflight = {}
+        self._views = OrderedDict()
+        self._views_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def selections(self, params: dict) -> dict:
+        params = dict(params)
+        name, start, end = ((params.pop(k, None) or [None])[-1] for k in ('window', 'start', 'end'))
+        out = {}
+        if name or start or end:
+            if self.time_col is None:
+                raise ApiError(400, "This dataset has no order dates to filter on.")
+            first, last = self.date_bounds
+            try:
+                rng = window("Custom" if start or end else name, last, start or first, end or last)
+            except ValueError as exc:
+                raise ApiError(400, str(exc))
+            if rng is not None:
+                out[self.time_col] = rng
+        for key, labels in params.items():
+            col = self.filter_cols.get(key)
+            if col is None:
+                raise ApiError(400, f"Unknown filter '{key}'; use one of {sorted(k for k, c in self.filter_cols.items() if c)}.")
+            out[col] = sorted(set(labels))
+        return out
+
+    def view(self, selections: dict) -> dict:
+        """Filtered rows, the aggregate view (cube cells when every filter is a cube dimension)
+        and one planner, shared by every endpoint asked about the same filters."""
+        key = selection_key(selections)
+        with self._views_lock:
+            if key in self._views:
+                self._views.move_to_end(key)
+                return self._views[key]
+        filtered, agg = select(self.data, selections)
+        view = {'filtered': filtered, 'agg': agg, 'planner': AggregationPlanner(agg)}
+        with self._views_lock:
+            self._views[key] = view
+            while len(self._views) > self.max_views:
+                self._views.popitem(last=False)
+        return view
+
+    def compute(self, route: str, arg: str, selections: dict):
+        col_map, rev = self.col_map, self.col_map.get('line_value')
+        v = self.view(selections)
+        if route == 'kpis':
+            k = kpis(v['agg'], col_map, rows=v['filtered'], customers=self.data['customers'])
+            return {name: _num(val) for name, val in k.items()}
+        if route == 'revenue':
+            col = col_map.get(arg) or arg
+            if arg not in CUBE_DIMS or col not in v['agg'].columns:
+                raise ApiError(404, f"No revenue breakdown by '{arg}'; use one of {sorted(k for k in CUBE_DIMS if (col_map.get(k) or k) in v['agg'].columns)}.")
+            return _series(aggregate(v['agg'], col, rev, planner=v['planner']).sort_values(ascending=False))
+        if route == 'trend':
+            return _series(aggregate(v['agg'], 'order_month', rev, planner=v['planner']).sort_index())
+        if route == 'new-vs-repeat':
+            out = new_vs_repeat_by_month(v['filtered'], col_map, self.data['customers'])
+            if out is None:
+                raise ApiError(404, "New vs repeat needs order, customer and month columns.")
+            return [{'month': str(r.order_month), 'new_customer_share': _num(r.new_customer_share), 'orders': _num(r.orders)}
+                    for r in out[1].itertuples()]
+        if route == 'filters':
+            out = {key: sorted(self.data['filter_index']['columns'].get(col, {})) for key, col in self.filter_cols.items() if col}
+            return {**out, 'window': WINDOWS[:-1]} if self.time_col else out
+        raise ApiError(404, f"Unknown endpoint /{route}.")
+
+    def stats(self) -> dict:
+        return {'hits': self.hits, 'misses': self.misses, 'coalesced': self.coalesced,
+                'responses': len(self._responses), 'views': len(self._views), 'in_flight': len(self._inflight)}
+
+    async def respond(self, route: str, arg: str, params: dict) -> bytes:
+        """JSON body for a request, from the cache, a computation already running, or a new one."""
+        if route == 'stats':
+            return json.dumps(self.stats()).encode()
+        selections = self.selections(params)
+        key = (route, arg, selection_key(selections))
+        body = self._responses.get(key)
+        if body is not None:
+            self._responses.move_to_end(key)
+            self.hits += 1
+            return body
+        running = self._inflight.get(key)
+        if running is not None:
+            self.coalesced += 1
+            return await asyncio.shield(running)
+        self.misses += 1
+        loop = asyncio.get_running_loop()
+        future = self._inflight[key] = loop.create_future()
+        try:
+            result = await loop.run_in_executor(self.pool, self.compute, route, arg, selections)
+            body = json.dumps(result, separators=(',', ':')).encode()
+            self._responses[key] = body
+            while len(self._responses) > self.max_responses:
+                self._responses.popitem(last=False)
+            future.set_result(body)
+            return body
+        except Exception as exc:
+            future.set_exception(exc)
+            future.exception()  # waiters re-raise it; don't warn when there are none
+            raise
+        finally:
+            del self._inflight[key]
+
+STATUS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error"}
+
+def _response(status: int, body: bytes, keep_alive: bool) -> bytes:
+    head = (f"HTTP/1.1 {status} {STATUS[status]}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    return head.encode('latin-1') + body
+
+async def dispatch(engine: Engine, method: str, target: str):
+    if method != "GET":
+        return 405, json.dumps({'error': "Only GET is supported."}).encode()
+    url = urlsplit(target)
+    parts = [p for p in url.path.split('/') if p]
+    route, arg = (parts + [''])[:2] if parts else ('', '')
+    try:
+        return 200, await engine.respond(route, arg, parse_qs(url.query))
+    except ApiError as exc:
+        return exc.status, json.dumps({'error': str(exc)}).encode()
+    except Exception as exc:
+        return 500, json.dumps({'error': f"{type(exc).__name__}: {exc}"}).encode()
+
+async def handle(engine: Engine, reader, writer):
+    """One HTTP/1.1 connection; requests are served in order while the client keeps it open."""
+    try:
+        while True:
+            line = await reader.readline()
+            if not line.strip():
+                break
+            method, target, version = line.decode('latin-1').split()
+            headers = {}
+            while True:
+                h = await reader.readline()
+                if h in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = h.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+            if int(headers.get('content-length') or 0):
+                await reader.readexactly(int(headers['content-length']))
+            keep_alive = version == "HTTP/1.1" and headers.get('connection', '').lower() != 'close'
+            status, body = await dispatch(engine, method, target)
+            writer.write(_response(status, body, keep_alive))
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+        pass
+    finally:
+        writer.close()
+
+async def serve(engine: Engine, host: str = "127.0.0.1", port: int = 8765):
+    server = await asyncio.start_server(lambda r, w: handle(engine, r, w), host, port)
+    print(f"serving {len(engine.data['frame']):,} rows on http://{host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+async def _get(reader, writer, path: str) -> bytes:
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+    await writer.drain()
+    headers = (await reader.readuntil(b"\r\n\r\n")).decode('latin-1').lower()
+    length = int(headers.split("content-length:")[1].split("\r\n")[0])
+    return await reader.readexactly(length)
+
+async def bench(engine: Engine, requests: int = 2000, concurrency: int = 32) -> dict:
+    """Latency (ms) of each filter set's first request and of repeats of the same sets."""
+    server = await asyncio.start_server(lambda r, w: handle(engine, r, w), "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    routes = ['/kpis', '/revenue/department', '/revenue/city', '/revenue/category', '/trend', '/new-vs-repeat']
+    labels = [(key, label) for key, values in engine.compute('filters', '', {}).items() for label in values]
+    paths = [f"{r}?{key}={label.replace(' ', '%20').replace('&', '%26')}" for key, label in labels for r in routes]
+
+    async def client(queue, out):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        while queue:
+            path = queue.pop()
+            t = time.perf_counter()
+            await _get(reader, writer, path)
+            out.append((time.perf_counter() - t) * 1000)
+        writer.close()
+
+    async def phase(todo):
+        out, queue = [], list(todo)
+        await asyncio.gather(*(client(queue, out) for _ in range(concurrency)))
+        return {'requests': len(out), 'p50_ms': float(np.percentile(out, 50)), 'p99_ms': float(np.percentile(out, 99))}
+
+    async with server:
+        cold = await phase(paths)
+        cached = await phase([paths[i % len(paths)] for i in range(requests)])
+    return {'cold': cold, 'cached': cached, **engine.stats()}
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="JSON API over the dashboard's KPIs and chart aggregates.")
+    sub = ap.add_subparsers(dest="command", required=True)
+    s = sub.add_parser("serve")
+    s.add_argument("--host", default="127.0.0.1")
+    s.add_argument("--port", type=int, default=8765)
+    s.add_argument("--workers", type=int, default=4, help="threads computing uncached responses")
+    b = sub.add_parser("bench", help="latency of cold and cached filter sets over local connections")
+    b.add_argument("--requests", type=int, default=2000)
+    b.add_argument("--concurrency", type=int, default=32)
+    args = ap.parse_args()
+    t = time.perf_counter()
+    engine = Engine(load_dataset(), workers=getattr(args, 'workers', 4))
+    print(f"dataset loaded in {time.perf_counter() - t:.2f}s")
+    if args.command == "serve":
+        asyncio.run(serve(engine, args.host, args.port))
+    else:
+        print(json.dumps(asyncio.run(bench(engine, args.requests, args.concurrency)), indent=1))
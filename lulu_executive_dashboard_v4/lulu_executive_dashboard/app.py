@@ -1,13 +1,40 @@
 
 import streamlit as st
 import pandas as pd
-import numpy as np
 from pathlib import Path
-from utils import standardize_columns, infer_columns, engineer_features, kpis, safe_num, per_order_metrics, new_vs_repeat_by_month
-import plots
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from utils import kpis, safe_num, per_order_metrics, new_vs_repeat_by_month
+from charts import chart_specs
+from cube import build_cube, build_cell_sketches, cube_columns, can_answer, is_cube
+import hll
+from planner import AggregationPlanner
+from filter_index import build_filter_index, select_rows, FILTERS
+from time_index import WINDOWS, date_bounds, window
+from snapshot import file_digest
+from streaming import stream_ingest, customer_kpis, order_histograms, new_vs_repeat
+from incremental import refresh, load_store
+from customers import build_customers
+from config import INGEST_MODE, CHUNK_SIZE, SKETCH_MODE, HLL_PRECISION, BACKEND, DUCKDB_THREADS, CHART_WORKERS, FIGURE_CACHE_MB, DEBUG_PANEL, PERF_LOG, PUBLISH_DIR
+from figure_cache import FigureCache, cached_chart, selection_key
+from instrument import PerfRecorder, owned_bytes
+from lazy import LazyModule
+import warmup
+import dataset
+
+# Backend engines are imported only when LULU_BACKEND selects them.
+duck = LazyModule('duckdb_backend')
+polars_engine = LazyModule('polars_backend')
+published = LazyModule('publish')
 
 st.set_page_config(page_title="Lulu Executive Dashboard", layout="wide")
 
+# Sessions share one in-memory dataset (cache_resource below). With copy-on-write, frames a session
+# derives from it (columns, views, filtered takes) never write into the shared buffers.
+pd.set_option("mode.copy_on_write", True)
+
+# Per-stage timings for this rerun; a pass-through unless the debug panel is enabled.
+perf = PerfRecorder(enabled=DEBUG_PANEL)
+
 # High-contrast, readable outcome card
 st.markdown(
     """
@@ -35,75 +62,263 @@ def outcome_card(note_text):
 BASE_DIR = Path(__file__).parent
 DATA_DIR = BASE_DIR / "data"
 DEFAULT_DATA_FILE = DATA_DIR / "lulu_uae_master_2000.csv"
+METADATA_FILE_NAME = "lulu_uae_master_metadata.csv"
+SNAPSHOT_DIR = DATA_DIR / ".cache"
+STORE_DIR = SNAPSHOT_DIR / "store"
 
-@st.cache_data
-def load_data():
+def source_file():
     if DEFAULT_DATA_FILE.exists():
-        df = pd.read_csv(DEFAULT_DATA_FILE)
-    else:
-        alt_path = Path("data") / "lulu_uae_master_2000.csv"
-        if alt_path.exists():
-            df = pd.read_csv(alt_path)
-        else:
-            raise FileNotFoundError("Data file not found. Ensure it exists at lulu_executive_dashboard/data/.")
-    df = standardize_columns(df)
-    col_map = infer_columns(df)
-    df = engineer_features(df, col_map)
-    return df, col_map
+        return DEFAULT_DATA_FILE
+    src = Path("data") / "lulu_uae_master_2000.csv"
+    if not src.exists():
+        raise FileNotFoundError("Data file not found. Ensure it exists at lulu_executive_dashboard/data/.")
+    return src
+
+@st.cache_resource
+def load_stream_state():
+    src = source_file()
+    return stream_ingest(src, src.with_name(METADATA_FILE_NAME), CHUNK_SIZE,
+                         sketch_precision=HLL_PRECISION if SKETCH_MODE else None)
+
+@st.cache_resource
+def load_incremental_store():
+    # Only files/rows not yet in the store are parsed; history is read back from Parquet parts.
+    refresh(DATA_DIR, STORE_DIR, METADATA_FILE_NAME, HLL_PRECISION if SKETCH_MODE else None)
+    return load_store(STORE_DIR)
+
+@st.cache_resource
+def load_published():
+    # memory-mapped read-only; every replica on the host maps the same files
+    return published.open_version(PUBLISH_DIR)
+
+@st.cache_resource
+def load_data():
+    # One frame per process, shared read-only by every session (cache_data would hand each
+    # session its own unpickled copy).
+    if INGEST_MODE == "incremental":
+        df, col_map = load_incremental_store()[:2]
+        return df, col_map
+    if INGEST_MODE == "published":
+        pub = load_published()
+        return pub['frame'], pub['col_map']
+    if INGEST_MODE == "stream":
+        # Rows are never held at once; the merged cube stands in for the line-level frame.
+        state, col_map = load_stream_state()
+        cube = state['cube'].copy()
+        cube.attrs['datetime_parse'] = state['datetime_parse']
+        return cube, col_map
+    src = source_file()
+    # Engineered frame is snapshotted per source-content hash; an edited CSV gets a new key.
+    return warmup.warmed('data', src) or dataset.load_frame(src, src.with_name(METADATA_FILE_NAME), SNAPSHOT_DIR)
 
 st.title("🛒 Lulu Executive Dashboard")
 st.caption("Executive-ready insights with clear, readable outcome suggestions.")
 
-df, col_map = load_data()
+if INGEST_MODE == "published" and published.current(PUBLISH_DIR) != load_published()['version']:
+    # publish.py swapped in a new version: drop every cached view of the old one
+    st.cache_resource.clear()
+
+# Polars reads and engineers the CSV itself, so it only replaces the in-memory ingest path.
+USE_POLARS = BACKEND == "polars" and polars_engine.pl is not None and INGEST_MODE == "memory"
+
+@st.cache_resource
+def load_polars():
+    src = source_file()
+    return polars_engine.load(src, src.with_name(METADATA_FILE_NAME))
+
+if USE_POLARS:
+    pdb = perf.call('load_polars', load_polars)
+    col_map, columns, parse_stats = pdb['col_map'], pdb['columns'], pdb['datetime_parse']
+else:
+    df, col_map = perf.call('load_data', load_data)
+    columns, parse_stats = df.columns, df.attrs.get('datetime_parse')
+if parse_stats and parse_stats['fallback']:
+    st.sidebar.caption(
+        f"Order dates: {parse_stats['vectorized']:,} rows parsed as `{parse_stats['format']}`, "
+        f"{parse_stats['fallback']:,} via fallback parser ({parse_stats['unparsed']:,} unparseable)."
+    )
+
+def filter_col(col_key):
+    col = col_map.get(col_key) or (col_key if col_key in columns else None)
+    return col if col and col in columns else None
+
+@st.cache_resource
+def load_customers():
+    # first month, order count, revenue and loyalty per customer; KPIs look filtered rows up here
+    if INGEST_MODE == "incremental":
+        return load_incremental_store()[4]
+    if INGEST_MODE == "published":
+        return load_published()['customers']
+    if INGEST_MODE == "stream":
+        return None
+    if (warm := warmup.warmed('customers', source_file())) is not None:
+        return warm
+    data, cmap = load_data()
+    return build_customers(data, cmap)
+
+# DuckDB needs line-level rows, so the streaming ingest mode always uses pandas.
+USE_DUCKDB = BACKEND == "duckdb" and duck.duckdb is not None and INGEST_MODE != "stream"
+
+@st.cache_resource
+def load_duckdb():
+    data, _ = load_data()
+    return duck.connect(data, DUCKDB_THREADS, load_customers())
+
+@st.cache_resource
+def load_filter_index():
+    # Row bitmasks are built once per process; selections only OR/AND packed bits.
+    if INGEST_MODE == "published":
+        return load_published()['filter_index']
+    if INGEST_MODE == "memory" and (warm := warmup.warmed('filter_index', source_file())) is not None:
+        return warm
+    data, _ = load_data()
+    return build_filter_index(data, [filter_col(key) for key, _ in FILTERS])
 
 # Sidebar filters
 with st.sidebar:
     st.header("Filters")
 def pick(col_key, label):
-    col = col_map.get(col_key) or (col_key if col_key in df.columns else None)
-    if col and col in df.columns:
-        vals = ["All"] + sorted([str(x) for x in df[col].dropna().unique()])
+    col = filter_col(col_key)
+    if col:
+        if USE_POLARS:
+            labels = polars_engine.distinct_labels(pdb, col)
+        elif USE_DUCKDB:
+            labels = duck.distinct_labels(load_duckdb(), col)
+        else:
+            labels = load_filter_index()['columns'][col]
+        vals = ["All"] + sorted(labels)
         return col, st.multiselect(label, vals, default=["All"])
     return None, None
 
+odt = filter_col('order_datetime')
+
+@st.cache_resource
+def load_date_bounds():
+    if USE_POLARS:
+        s = pdb['frame'][odt]
+        return pd.Timestamp(s.min()), pd.Timestamp(s.max())
+    return date_bounds(df, odt)
+
 with st.sidebar:
-    col_city, f_city = pick('city', "City")
-    col_dept, f_dept = pick('department', "Department")
-    col_cat, f_cat = pick('category', "Category")
-    col_brand, f_brand = pick('brand', "Brand")
-    col_channel, f_channel = pick('channel', "Channel")
-    col_gender, f_gender = pick('gender', "Gender")
-    col_ageg, f_ageg = pick('age_group', "Age Group")
-    col_store_format, f_store = pick('store_format', "Store Format")
-    col_nat, f_nat = pick('nationality_group', "Nationality Group")
+    selections = {}
+    # applied first: a window is a slice of the time-sorted rows (time_index.py)
+    if odt:
+        first, last = load_date_bounds()
+        choice = st.selectbox("Date range", WINDOWS)
+        if choice == "Custom":
+            picked = st.date_input("From / to", (first.date(), last.date()), min_value=first.date(), max_value=last.date())
+            rng = window(choice, last, *picked) if len(picked) == 2 else None
+        else:
+            rng = window(choice, last)
+        if rng is not None:
+            selections[odt] = rng
+            st.caption(f"{rng.start:%d %b %Y} – {rng.stop - pd.Timedelta(days=1):%d %b %Y}")
+    elif INGEST_MODE == "stream":
+        st.caption("Date range: not available in streaming mode, which keeps monthly cube cells instead of order timestamps.")
+    for key, label in FILTERS:
+        col, sel = pick(key, label)
+        if col and sel and "All" not in sel:
+            selections[col] = sel
 
 def apply_filters(df):
-    def apply(d, col, sel):
-        if col and sel and "All" not in sel:
-            return d[d[col].astype(str).isin(sel)]
-        return d
-    d = df
-    d = apply(d, col_city, f_city)
-    d = apply(d, col_dept, f_dept)
-    d = apply(d, col_cat, f_cat)
-    d = apply(d, col_brand, f_brand)
-    d = apply(d, col_channel, f_channel)
-    d = apply(d, col_gender, f_gender)
-    d = apply(d, col_ageg, f_ageg)
-    d = apply(d, col_store_format, f_store)
-    d = apply(d, col_nat, f_nat)
-    return d
-
-filtered = apply_filters(df)
+    return dataset.filter_frame(df, load_filter_index(), selections)
+
+@st.cache_resource
+def load_cube():
+    if INGEST_MODE == "published":
+        pub = load_published()
+        return pub['cube'], pub['cube_index'], pub['sketches']
+    if INGEST_MODE == "memory" and (warm := warmup.warmed('cube', source_file())) is not None:
+        return warm
+    data, cmap = load_data()
+    if INGEST_MODE == "incremental":
+        # the store keeps its cube (and sketches) merged in place at refresh time
+        _, _, cube, sketches, _ = load_incremental_store()
+        return cube, build_filter_index(cube, cube_columns(cube, cmap)), sketches
+    cube = build_cube(data, cmap)
+    if cube is None:
+        return None, None, None
+    sketches = None
+    if SKETCH_MODE:
+        if INGEST_MODE == "stream":
+            sketches = load_stream_state()[0]['sketches']
+        else:
+            sketches = build_cell_sketches(data, cmap, len(cube), HLL_PRECISION)
+    return cube, build_filter_index(cube, cube_columns(cube, cmap)), sketches
+
+def cube_view():
+    cube, cube_index, _ = load_cube()
+    if not can_answer(cube, selections):
+        return None
+    rows = select_rows(cube_index, selections)
+    return cube if rows is None else cube.take(rows)
 
-# KPIs
 rev_col = col_map.get('line_value')
 qty_col = col_map.get('quantity')
+daypart_cols = ['day_of_week', 'hour_of_day']
+# Groupings the charts below ask the planner for; the polars engine computes them alongside the filters.
+CHART_KEYS = [('department',), ('category',), ('category', 'gender'), ('order_month',), ('gender', 'age_group'),
+              ('city',), ('channel',), ('store_format',), ('city', 'store_format'), ('nationality_group',)]
+distinct = None
+chart_aggregates = {}
+histograms = None
+if USE_POLARS:
+    # One collect_all per rerun: filter, cube, KPIs, per-order views and chart groupbys together.
+    res = perf.call('polars.run', polars_engine.run, pdb, col_map, selections, [[col_map.get(c) or c for c in keys] for keys in CHART_KEYS])
+    agg_view, daypart, k, per, nvr = res['cube'], res['daypart'], res['kpis'], res['per'], res['nvr']
+    chart_aggregates = res['aggregates']
+elif USE_DUCKDB:
+    # Filters are pushed into SQL; only aggregates come back to pandas.
+    db = load_duckdb()
+    agg_view = perf.call('duckdb.cube', duck.cube, db, col_map, selections)
+    daypart = perf.call('duckdb.daypart', duck.group_frame, db, daypart_cols, rev_col, selections) if rev_col and set(daypart_cols) <= set(db['columns']) else None
+    k = perf.call('duckdb.kpis', duck.kpis, db, col_map, selections)
+    per = perf.call('duckdb.per_order_metrics', duck.per_order_metrics, db, col_map, selections)
+    nvr = perf.call('duckdb.new_vs_repeat_by_month', duck.new_vs_repeat_by_month, db, col_map, selections)
+else:
+    filtered = perf.call('apply_filters', apply_filters, df)
+    # Sum/count charts and KPIs read the cube whenever every active filter is a cube dimension.
+    agg_view = perf.call('cube_view', cube_view)
+    if agg_view is None:
+        agg_view = filtered
+    daypart = filtered if set(daypart_cols) <= set(filtered.columns) else None
+    sketches = load_cube()[2]
+    if sketches is not None and is_cube(agg_view):
+        # cube rows keep their positions as index labels, so they address the register matrix
+        distinct = hll.estimate(hll.merge(sketches[agg_view.index.to_numpy()]))
+    customers = perf.call('load_customers', load_customers)
+    k = perf.call('kpis', kpis, agg_view, col_map, rows=filtered, distinct_customers=distinct, customers=customers)
+    per = perf.call('per_order_metrics', per_order_metrics, filtered, col_map)
+    nvr = perf.call('new_vs_repeat_by_month', new_vs_repeat_by_month, filtered, col_map, customers, per=per)
+    if INGEST_MODE == "stream" and not selections:
+        # the merged state covers every row, so it answers the unfiltered views that need orders
+        state = load_stream_state()[0]
+        exact = customer_kpis(state)
+        if distinct is not None:
+            # the sketch estimate stays the tile shown in sketch mode
+            exact.pop('Unique Customers', None)
+        k.update(exact)
+        if state['daypart'] is not None:
+            daypart = state['daypart'].rename(rev_col).reset_index()
+        histograms = order_histograms(state)
+        monthly = new_vs_repeat(state)
+        nvr = None if monthly is None else (None, monthly)
+    elif INGEST_MODE == "stream":
+        hidden = ["Revenue Heatmap: Day-of-Week × Hour", "Distribution: Order Revenue (AOV)", "Distribution: Order Units",
+                  "New Customer Share by Month", "Repeat Customer Rate"] + (["Unique Customers"] if distinct is None else [])
+        st.info("Streaming mode keeps aggregates for the whole file only, so with filters active these are hidden: "
+                + ", ".join(hidden) + ".")
+# Charts over agg_view share one memo, so repeated groupbys in this rerun run once.
+planner = AggregationPlanner(agg_view)
+planner.prime(chart_aggregates)
+
+# KPIs
 st.subheader("Key Performance Indicators")
-k = kpis(filtered, col_map)
 cols = st.columns(len(k) or 1)
 for (name, val), c in zip(k.items(), cols):
-    c.metric(name, safe_num(val))
+    c.metric(name, f"{val:.1%}" if name == 'Repeat Customer Rate' else safe_num(val))
+    if name == 'Unique Customers' and distinct is not None:
+        c.caption(f"HyperLogLog estimate, ±{hll.std_error(HLL_PRECISION):.1%} std. error")
 st.markdown("---")
 
 def render(fig, note):
@@ -111,74 +326,77 @@ def render(fig, note):
         st.plotly_chart(fig, use_container_width=True)
         outcome_card(note)
 
-# Core views (kept)
-if rev_col and col_map.get('department'):
-    fig, note = plots.bar_by(filtered, rev_col, col_map['department'], "Revenue by Department", "Identify top-selling departments.")
-    render(fig, note)
-if rev_col and col_map.get('category'):
-    if col_map.get('gender'):
-        fig, note = plots.stacked_bar_by(filtered, rev_col, col_map['category'], col_map['gender'], "Revenue by Category by Gender", "Category-gender mix analysis.")
-    else:
-        fig, note = plots.bar_by(filtered, rev_col, col_map['category'], "Revenue by Category", "Category mix analysis.")
-    render(fig, note)
-if rev_col and ('order_month' in filtered.columns):
-    fig, note = plots.timeseries_monthly(filtered, col_map.get('order_datetime','order_date'), rev_col, "Monthly Revenue Trend", "Seasonality and trend.")
-    render(fig, note)
-if rev_col and col_map.get('gender') and col_map.get('age_group'):
-    fig, note = plots.gender_age_breakdown(filtered, rev_col, col_map['gender'], col_map['age_group'], "Revenue by Gender & Age Group", "Cohort contribution analysis.")
-    render(fig, note)
-if rev_col and col_map.get('city'):
-    fig, note = plots.bar_by(filtered, rev_col, col_map['city'], "Revenue by City", "Geographic contribution.")
-    render(fig, note)
-if rev_col and col_map.get('channel'):
-    fig, note = plots.aov_by(filtered, rev_col, col_map['channel'], "Average Order Value by Channel", "Basket quality by channel.")
-    render(fig, note)
-if rev_col and col_map.get('store_format'):
-    fig, note = plots.aov_by(filtered, rev_col, col_map['store_format'], "Average Order Value by Store Format", "Basket quality by format.")
-    render(fig, note)
-
-# New insights
-
-# A) Pareto by Category (80/20)
-if rev_col and col_map.get('category'):
-    fig, note = plots.pareto_chart(filtered, rev_col, col_map['category'], "Pareto: Category Revenue Concentration", "Assortment concentration.")
-    render(fig, note)
-
-# B) Daypart heatmap (Day × Hour)
-if rev_col and ('day_of_week' in filtered.columns) and ('hour_of_day' in filtered.columns):
-    fig, note = plots.heatmap_pivot(filtered, rev_col, 'day_of_week', 'hour_of_day', "Revenue Heatmap: Day-of-Week × Hour", "Daypart optimization.")
-    render(fig, note)
-
-# C) City × Store Format heatmap
-if rev_col and col_map.get('city') and col_map.get('store_format'):
-    fig, note = plots.heatmap_pivot(filtered, rev_col, col_map['city'], col_map['store_format'], "Revenue Heatmap: City × Store Format", "Network mix pockets.")
-    render(fig, note)
-
-# D) AOV distribution (per-order)
-per = per_order_metrics(filtered, col_map)
-if per is not None and 'order_revenue' in per.columns:
-    fig, note = plots.hist_distribution(per['order_revenue'], "Distribution: Order Revenue (AOV)", "Order Revenue (AED)", "Basket value dispersion.")
-    render(fig, note)
-
-# E) Units distribution (per-order if available, else line level)
-if per is not None and 'order_units' in per.columns:
-    fig, note = plots.hist_distribution(per['order_units'], "Distribution: Order Units", "Units per Order", "Pack size & basket depth.")
-    render(fig, note)
-
-# F) New vs Repeat customers share by month
-nvr = new_vs_repeat_by_month(filtered, col_map)
-if nvr is not None:
-    per_orders, monthly = nvr
-    import plotly.express as px
-    fig = px.line(monthly, x='order_month', y='new_customer_share', markers=True, title="New Customer Share by Month")
-    note = "Track the mix of new vs repeat customers; tailor acquisition vs loyalty spend accordingly."
-    render(fig, note)
-
-# G) Nationality group share (if available)
-nat_col = col_map.get('nationality_group')
-if rev_col and nat_col:
-    fig, note = plots.donut_share(filtered, rev_col, nat_col, "Revenue Share by Nationality Group", "Offer localization & cultural moments.")
-    render(fig, note)
+@st.cache_resource
+def figure_cache():
+    # one LRU for every session, so any user's earlier selection renders from cache
+    return FigureCache(FIGURE_CACHE_MB << 20) if FIGURE_CACHE_MB > 0 else None
+
+@st.cache_resource
+def dataset_version():
+    # the loaders are cached for the life of the process, so this is fixed alongside them
+    if INGEST_MODE == "incremental":
+        return f"incremental:{file_digest(STORE_DIR / 'manifest.json')[:16]}"
+    if INGEST_MODE == "published":
+        return f"published:{load_published()['version']}"
+    return f"{INGEST_MODE}:{file_digest(source_file())[:16]}"
+
+# Charts are queued as (chart id, function, args) in page order and built below.
+charts = chart_specs(col_map, agg_view, daypart, per, nvr, planner, histograms)
+
+fig_cache = figure_cache()
+cache_key = (selection_key(selections), dataset_version())
+if CHART_WORKERS > 1:
+    # plotly is lazy (plots.py); import it here, once, rather than on several chart threads at once
+    warmup.import_deferred()
+    # Placeholders fix the page order; each slot is filled as soon as its chart is built, so the
+    # rerun waits for the slowest chart rather than the sum of all of them.
+    slots = [st.empty() for _ in charts]
+    with ThreadPoolExecutor(max_workers=CHART_WORKERS) as pool:
+        futures = {pool.submit(cached_chart, fig_cache, (chart_id,) + cache_key, perf.wrap(f"plots.{chart_id}", fn), *args, **kwargs): (chart_id, slot)
+                   for (chart_id, fn, args, kwargs), slot in zip(charts, slots)}
+        for future in as_completed(futures):
+            chart_id, slot = futures[future]
+            with slot.container():
+                perf.call(f"render.{chart_id}", render, *future.result())
+else:
+    for chart_id, fn, args, kwargs in charts:
+        fig, note = cached_chart(fig_cache, (chart_id,) + cache_key, perf.wrap(f"plots.{chart_id}", fn), *args, **kwargs)
+        perf.call(f"render.{chart_id}", render, fig, note)
+if fig_cache is not None:
+    st.sidebar.caption(f"Figure cache: {fig_cache.hits:,} hits / {fig_cache.misses:,} misses, "
+                       f"{len(fig_cache)} figures, {fig_cache.bytes / 1e6:.1f} MB")
 
 st.markdown("---")
 st.caption("© 2025 — Executive dashboard. Replace assets/logo.png for branding.")
+
+if DEBUG_PANEL:
+    timings = perf.frame()
+    with st.sidebar.expander("Performance (this rerun)", expanded=False):
+        st.caption(f"{timings['wall_ms'].sum():,.0f} ms wall over {len(timings)} stages (chart stages overlap when run on threads)")
+        st.dataframe(timings.sort_values('wall_ms', ascending=False), hide_index=True, use_container_width=True)
+    # memory held by this session on top of the process-wide dataset and cube
+    shared = [] if USE_POLARS else [df]
+    if not (USE_POLARS or USE_DUCKDB):
+        shared.append(load_cube()[0])
+    owned = {
+        'filtered rows': None if USE_POLARS or USE_DUCKDB else filtered,
+        'aggregate view': agg_view,
+        'daypart': daypart,
+        'per-order': per,
+        'new vs repeat': nvr,
+        'planner memo': planner.results(),
+    }
+    session_mb, counted = {}, list(shared)
+    for name, obj in owned.items():
+        # objects listed earlier (e.g. daypart is the filtered frame in pandas mode) count once
+        session_mb[name] = owned_bytes([obj], counted) / 2 ** 20
+        counted.append(obj)
+    with st.sidebar.expander("Memory (this session)", expanded=False):
+        st.caption(f"Shared dataset: {owned_bytes(shared) / 2 ** 20:,.1f} MB, one copy for all sessions. "
+                   f"This session: {sum(session_mb.values()):,.2f} MB.")
+        st.dataframe(pd.DataFrame({'object': list(session_mb), 'MB': list(session_mb.values())}),
+                     hide_index=True, use_container_width=True)
+    session = st.session_state.setdefault('perf_session', perf.rerun)
+    perf.write_jsonl(PERF_LOG, session=session, backend=BACKEND, ingest=INGEST_MODE,
+                     filters={col: sorted(map(str, labels)) for col, labels in selections.items()},
+                     session_mb=round(sum(session_mb.values()), 3))
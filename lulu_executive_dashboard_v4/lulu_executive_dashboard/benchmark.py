@@ -0,0 +1,193 @@
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import plots
+from utils import load_typed_csv, standardize_columns, infer_columns, engineer_features, kpis, per_order_metrics, new_vs_repeat_by_month
+from planner import AggregationPlanner
+from generate_data import learn, generate_partition
+
+# Timing and peak-memory benchmarks for the utils/plots data path on synthetic data.
+#   python benchmark.py run --scales 10k,1M,10M --out bench.json
+#   python benchmark.py compare baseline.json bench.json
+# Chart functions are measured with a fresh AggregationPlanner ('total'), again with the warmed
+# one ('figure': figure construction only), and as a planner-only pass that replays the chart's
+# aggregate requests on a fresh planner ('aggregate').
+
+BASE_DIR = Path(__file__).parent
+DATA_DIR = BASE_DIR / "data"
+BENCH_DIR = DATA_DIR / ".cache" / "bench"
+SAMPLE = DATA_DIR / "lulu_uae_master_2000.csv"
+METADATA = DATA_DIR / "lulu_uae_master_metadata.csv"
+
+def parse_rows(text: str) -> int:
+    text = text.strip().upper()
+    scale = {'K': 1_000, 'M': 1_000_000}.get(text[-1], 1)
+    return int(float(text[:-1] if scale > 1 else text) * scale)
+
+def dataset(rows: int, chunk: int = 1_000_000) -> Path:
+    """Synthetic CSV with `rows` lines in the sample's format, generated once and reused."""
+    path = BENCH_DIR / f"lines-{rows}.csv"
+    if path.exists():
+        return path
+    BENCH_DIR.mkdir(parents=True, exist_ok=True)
+    model = learn(SAMPLE, METADATA)
+    tmp = path.with_suffix(".tmp")
+    for start in range(0, rows, chunk):
+        df = generate_partition(model, min(chunk, rows - start), start, seed=0)
+        df['order_datetime'] = df['order_datetime'].dt.strftime('%m/%d/%Y %H:%M')
+        df.to_csv(tmp, mode='w' if start == 0 else 'a', header=start == 0, index=False)
+    tmp.replace(path)
+    return path
+
+def measure(fn, repeat: int) -> dict:
+    """Best wall time of `repeat` calls, then peak traced memory of one more call."""
+    times = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'seconds': min(times), 'peak_mb': peak / 2 ** 20}
+
+def chart_cases(df: pd.DataFrame, col_map: dict, per: pd.DataFrame, nvr=None) -> dict:
+    """name -> (function, args, kwargs) for every chart in plots.py, on this frame's columns."""
+    rev, qty = col_map['line_value'], col_map['quantity']
+    c = lambda key: col_map.get(key) or key
+    cases = {
+        'bar_by': (plots.bar_by, (df, rev, c('department'), "t", "n"), {}),
+        'stacked_bar_by': (plots.stacked_bar_by, (df, rev, c('category'), c('gender'), "t", "n"), {}),
+        'timeseries_monthly': (plots.timeseries_monthly, (df, c('order_datetime'), rev, "t", "n"), {}),
+        'gender_age_breakdown': (plots.gender_age_breakdown, (df, rev, c('gender'), c('age_group'), "t", "n"), {}),
+        'aov_by': (plots.aov_by, (df, rev, c('channel'), "t", "n"), {}),
+        'pareto_chart': (plots.pareto_chart, (df, rev, c('category'), "t", "n"), {}),
+        'heatmap_pivot': (plots.heatmap_pivot, (df, rev, c('city'), c('store_format'), "t", "n"), {}),
+        'donut_share': (plots.donut_share, (df, rev, c('nationality_group'), "t", "n"), {}),
+        'bar_simple': (plots.bar_simple, (df, rev, c('brand'), "t", "n"), {}),
+        'bar_dayofweek': (plots.bar_dayofweek, (df, rev, "t", "n"), {}),
+        'bar_hourofday': (plots.bar_hourofday, (df, rev, "t", "n"), {}),
+        'qty_by_group': (plots.qty_by_group, (df, qty, c('category'), "t", "n"), {}),
+        'discount_vs_aov': (plots.discount_vs_aov, (df, c('discount'), rev, "t", "n"), {}),
+        'scatter_price_qty': (plots.scatter_price_qty, (df, c('unit_price'), qty, "t", "n"), {}),
+    }
+    if per is not None:
+        cases['hist_distribution'] = (plots.hist_distribution, (per['order_revenue'], "t", "x", "n"), {'bins': 'fd'})
+    if nvr is not None:
+        cases['new_customer_share'] = (plots.new_customer_share, (nvr[1], "t"), {})
+    return cases
+
+def bench_scale(rows: int, repeat: int, log=print) -> list:
+    path = dataset(rows)
+    results = []
+    def record(name, stage, fn=None, m=None):
+        m = m or measure(fn, repeat)
+        results.append({'rows': rows, 'name': name, 'stage': stage, **m})
+        log(f"{rows:>12,}  {name:<32}{stage:<10}{m['seconds'] * 1000:>10.1f} ms{m['peak_mb']:>10.1f} MB")
+        return m
+
+    record('ingest', 'total', lambda: standardize_columns(load_typed_csv(path, METADATA)))
+    raw = standardize_columns(load_typed_csv(path, METADATA))
+    record('infer_columns', 'total', lambda raw=raw: infer_columns(raw))
+    col_map = infer_columns(raw)
+    record('engineer_features', 'total', lambda raw=raw: engineer_features(raw, dict(col_map)))
+    df = engineer_features(raw, col_map)
+    del raw
+    record('kpis', 'total', lambda: kpis(df, col_map))
+    record('per_order_metrics', 'total', lambda: per_order_metrics(df, col_map))
+    record('new_vs_repeat_by_month', 'total', lambda: new_vs_repeat_by_month(df, col_map))
+    per = per_order_metrics(df, col_map)
+    nvr = new_vs_repeat_by_month(df, col_map, per=per)
+
+    for name, (fn, args, kwargs) in chart_cases(df, col_map, per, nvr).items():
+        label = f"plots.{name}"
+        if 'planner' in fn.__code__.co_varnames:
+            record(label, 'total', lambda: fn(*args, planner=AggregationPlanner(args[0]), **kwargs))
+            warm = AggregationPlanner(args[0])
+            fn(*args, planner=warm, **kwargs)
+            record(label, 'figure', lambda: fn(*args, planner=warm, **kwargs))
+            # the memo keeps request order, so the replay rolls up from the same finer results
+            requests = list(warm.results())
+            def replay(frame=args[0], requests=requests):
+                planner = AggregationPlanner(frame)
+                return [planner.aggregate(*req) for req in requests]
+            record(label, 'aggregate', replay)
+        elif fn is plots.hist_distribution:
+            values = args[0]
+            record(label, 'aggregate', lambda: plots.histogram_counts(values, plots.histogram_edges(values, 'fd')))
+            edges = plots.histogram_edges(values, 'fd')
+            counts = plots.histogram_counts(values, edges)
+            record(label, 'figure', lambda: fn(*args, edges=edges, counts=counts))
+        elif fn is plots.new_customer_share:
+            record(label, 'aggregate', lambda: new_vs_repeat_by_month(df, col_map, per=per))
+            record(label, 'figure', lambda: fn(*args, **kwargs))
+        elif fn is plots.scatter_price_qty:
+            record(label, 'aggregate', lambda: plots.regression_stats(df[args[1]], df[args[2]]))
+            stats = plots.regression_stats(df[args[1]], df[args[2]])
+            record(label, 'figure', lambda: fn(*args, stats=stats))
+        else:
+            record(label, 'total', lambda: fn(*args, **kwargs))
+    return results
+
+def run(scales, repeat: int, out) -> dict:
+    report = {
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'repeat': repeat,
+        'results': [],
+    }
+    for rows in scales:
+        report['results'].extend(bench_scale(rows, repeat))
+    Path(out).write_text(json.dumps(report, indent=1))
+    return report
+
+def compare(baseline, current, threshold: float = 0.10, min_seconds: float = 0.005) -> list:
+    """Rows of (key, base, new, change) whose time or peak memory grew by more than `threshold`.
+    Changes under min_seconds are ignored as timer noise."""
+    base = {(r['rows'], r['name'], r['stage']): r for r in json.loads(Path(baseline).read_text())['results']}
+    regressions = []
+    for r in json.loads(Path(current).read_text())['results']:
+        key = (r['rows'], r['name'], r['stage'])
+        b = base.get(key)
+        if b is None:
+            continue
+        dt = r['seconds'] - b['seconds']
+        if b['seconds'] and dt > min_seconds and dt / b['seconds'] > threshold:
+            regressions.append((key, 'seconds', b['seconds'], r['seconds'], dt / b['seconds']))
+        if b['peak_mb'] > 1 and (r['peak_mb'] - b['peak_mb']) / b['peak_mb'] > threshold:
+            regressions.append((key, 'peak_mb', b['peak_mb'], r['peak_mb'], (r['peak_mb'] - b['peak_mb']) / b['peak_mb']))
+    return regressions
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="Benchmark the utils/plots data path and compare runs.")
+    sub = ap.add_subparsers(dest="command", required=True)
+    r = sub.add_parser("run", help="time and memory-profile every stage at each scale")
+    r.add_argument("--scales", default="10k,1M,10M", help="comma-separated row counts, e.g. 10k,1M,10M")
+    r.add_argument("--repeat", type=int, default=3)
+    r.add_argument("--out", default="bench.json")
+    c = sub.add_parser("compare", help="flag regressions of CURRENT against BASELINE")
+    c.add_argument("baseline")
+    c.add_argument("current")
+    c.add_argument("--threshold", type=float, default=0.10, help="relative slowdown/growth to flag (default 10%%)")
+    c.add_argument("--min-ms", type=float, default=5.0, help="ignore slowdowns smaller than this (timer noise)")
+    args = ap.parse_args()
+    if args.command == "run":
+        run([parse_rows(s) for s in args.scales.split(",")], args.repeat, args.out)
+        print(f"wrote {args.out}")
+    else:
+        regressions = compare(args.baseline, args.current, args.threshold, args.min_ms / 1000)
+        for (rows, name, stage), metric, old, new, change in regressions:
+            print(f"REGRESSION {rows:>12,}  {name:<32}{stage:<10}{metric:<8}{old:>10.4g} -> {new:<10.4g}(+{change:.0%})")
+        print(f"{len(regressions)} regression(s) over {args.threshold:.0%}")
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,68 @@
+import plots
+
+# The dashboard's charts in page order, shared by the app and the headless renderer (report.py).
+# Each entry is (chart id, function, args, kwargs); calling it returns (fig, outcome note).
+
+def chart_specs(col_map: dict, agg_view, daypart=None, per=None, nvr=None, planner=None, histograms=None) -> list:
+    """histograms: {per column: (edges, counts)} standing in for `per` when only binned
+    order totals are kept (streaming.order_histograms)."""
+    rev_col = col_map.get('line_value')
+    charts = []
+    def chart(chart_id, fn, *args, **kwargs):
+        charts.append((chart_id, fn, args, kwargs))
+    def histogram(chart_id, col, *labels, **kwargs):
+        if per is not None and col in per.columns:
+            chart(chart_id, plots.hist_distribution, per[col], *labels, **kwargs)
+        elif histograms and col in histograms:
+            edges, counts = histograms[col]
+            chart(chart_id, plots.hist_distribution, None, *labels, edges=edges, counts=counts)
+
+    # Core views (kept)
+    if rev_col and col_map.get('department'):
+        chart('department', plots.bar_by, agg_view, rev_col, col_map['department'], "Revenue by Department", "Identify top-selling departments.", planner=planner)
+    if rev_col and col_map.get('category'):
+        if col_map.get('gender'):
+            chart('category_gender', plots.stacked_bar_by, agg_view, rev_col, col_map['category'], col_map['gender'], "Revenue by Category by Gender", "Category-gender mix analysis.", planner=planner)
+        else:
+            chart('category', plots.bar_by, agg_view, rev_col, col_map['category'], "Revenue by Category", "Category mix analysis.", planner=planner)
+    if rev_col and ('order_month' in agg_view.columns):
+        chart('monthly_trend', plots.timeseries_monthly, agg_view, col_map.get('order_datetime','order_date'), rev_col, "Monthly Revenue Trend", "Seasonality and trend.", planner=planner)
+    if rev_col and col_map.get('gender') and col_map.get('age_group'):
+        chart('gender_age', plots.gender_age_breakdown, agg_view, rev_col, col_map['gender'], col_map['age_group'], "Revenue by Gender & Age Group", "Cohort contribution analysis.", planner=planner)
+    if rev_col and col_map.get('city'):
+        chart('city', plots.bar_by, agg_view, rev_col, col_map['city'], "Revenue by City", "Geographic contribution.", planner=planner)
+    if rev_col and col_map.get('channel'):
+        chart('aov_channel', plots.aov_by, agg_view, rev_col, col_map['channel'], "Average Order Value by Channel", "Basket quality by channel.", planner=planner)
+    if rev_col and col_map.get('store_format'):
+        chart('aov_store_format', plots.aov_by, agg_view, rev_col, col_map['store_format'], "Average Order Value by Store Format", "Basket quality by format.", planner=planner)
+
+    # New insights
+
+    # A) Pareto by Category (80/20)
+    if rev_col and col_map.get('category'):
+        chart('pareto_category', plots.pareto_chart, agg_view, rev_col, col_map['category'], "Pareto: Category Revenue Concentration", "Assortment concentration.", planner=planner)
+
+    # B) Daypart heatmap (Day × Hour)
+    if rev_col and daypart is not None:
+        chart('heatmap_daypart', plots.heatmap_pivot, daypart, rev_col, 'day_of_week', 'hour_of_day', "Revenue Heatmap: Day-of-Week × Hour", "Daypart optimization.")
+
+    # C) City × Store Format heatmap
+    if rev_col and col_map.get('city') and col_map.get('store_format'):
+        chart('heatmap_city_format', plots.heatmap_pivot, agg_view, rev_col, col_map['city'], col_map['store_format'], "Revenue Heatmap: City × Store Format", "Network mix pockets.", planner=planner)
+
+    # D) AOV distribution (per-order)
+    histogram('hist_order_revenue', 'order_revenue', "Distribution: Order Revenue (AOV)", "Order Revenue (AED)", "Basket value dispersion.", bins='fd')
+
+    # E) Units distribution (per-order if available, else line level)
+    histogram('hist_order_units', 'order_units', "Distribution: Order Units", "Units per Order", "Pack size & basket depth.")
+
+    # F) New vs Repeat customers share by month
+    if nvr is not None:
+        per_orders, monthly = nvr
+        chart('new_customer_share', plots.new_customer_share, monthly, "New Customer Share by Month")
+
+    # G) Nationality group share (if available)
+    nat_col = col_map.get('nationality_group')
+    if rev_col and nat_col:
+        chart('nationality_share', plots.donut_share, agg_view, rev_col, nat_col, "Revenue Share by Nationality Group", "Offer localization & cultural moments.", planner=planner)
+    return charts
@@ -0,0 +1,33 @@
+import os
+
+# Deployment switches, read from the environment so each host can pick its own mode.
+
+# 'memory' loads the whole CSV; 'stream' reads it in chunks and keeps only mergeable aggregates;
+# 'incremental' appends new files/rows in data/ to a Parquet store (see incremental.py);
+# 'published' memory-maps the version that `python publish.py` wrote to PUBLISH_DIR.
+INGEST_MODE = os.environ.get("LULU_INGEST_MODE", "memory").lower()
+CHUNK_SIZE = int(os.environ.get("LULU_CHUNK_SIZE", "250000"))
+PUBLISH_DIR = os.environ.get("LULU_PUBLISH_DIR", os.path.join(os.path.dirname(__file__), "data", ".cache", "published"))
+
+# Distinct-customer KPI from per-cube-cell HyperLogLog sketches instead of an exact nunique().
+# Memory is cube cells x 2**HLL_PRECISION bytes; standard error is 1.04 / sqrt(2**HLL_PRECISION).
+SKETCH_MODE = os.environ.get("LULU_SKETCH_MODE", "0").lower() in ("1", "true", "yes")
+HLL_PRECISION = int(os.environ.get("LULU_HLL_PRECISION", "10"))
+
+# Execution backend for filters and aggregations: 'pandas', 'duckdb' (in-process SQL) or 'polars'
+# (lazy queries collected together; thread count via POLARS_MAX_THREADS).
+BACKEND = os.environ.get("LULU_BACKEND", "pandas").lower()
+DUCKDB_THREADS = int(os.environ.get("LULU_DUCKDB_THREADS", "0")) or None
+
+# Charts are built on a thread pool of this size when > 1 (pandas groupby kernels release the GIL);
+# 0 or 1 builds them one after another.
+CHART_WORKERS = int(os.environ.get("LULU_CHART_WORKERS", "0"))
+
+# Byte budget (MB) of the process-wide LRU of rendered figures, keyed by chart, filters and
+# dataset version; 0 disables it.
+FIGURE_CACHE_MB = int(os.environ.get("LULU_FIGURE_CACHE_MB", "64"))
+
+# Per-rerun stage timings (wall, CPU, peak allocation, output rows) in a sidebar panel, also
+# appended as JSON lines to PERF_LOG. Tracing allocations slows the app, so keep it off by default.
+DEBUG_PANEL = os.environ.get("LULU_DEBUG", "0").lower() in ("1", "true", "yes")
+PERF_LOG = os.environ.get("LULU_PERF_LOG", os.path.join(os.path.dirname(__file__), "data", ".cache", "perf.jsonl"))
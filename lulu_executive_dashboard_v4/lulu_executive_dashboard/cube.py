@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import hll
+
+# Grain of the pre-aggregated cube; keys are col_map keys except the engineered order_month.
+CUBE_DIMS = ['order_month', 'city', 'store_format', 'channel', 'department', 'category', 'gender', 'age_group', 'nationality_group']
+LINE_COUNT = 'line_count'
+
+def cube_columns(df: pd.DataFrame, col_map: dict) -> list:
+    cols = []
+    for key in CUBE_DIMS:
+        col = col_map.get(key) or (key if key in df.columns else None)
+        if col and col in df.columns and col not in cols:
+            cols.append(col)
+    return cols
+
+def cube_measures(col_map: dict) -> list:
+    return [c for c in (col_map.get('line_value'), col_map.get('quantity')) if c]
+
+def build_cube(df: pd.DataFrame, col_map: dict) -> pd.DataFrame:
+    """Sum of revenue/quantity and line count per cell of CUBE_DIMS.
+
+    Measure columns keep their original names, so any sum-based groupby in plots.py gives the
+    same answer on the cube as on the raw rows. Means must be weighted by LINE_COUNT.
+    Passing concatenated cubes re-aggregates them, which is how partial cubes are merged.
+    """
+    dims = cube_columns(df, col_map)
+    measures = [c for c in cube_measures(col_map) if c in df.columns]
+    if not dims:
+        return None
+    # widen int8/int16 measures first so cell sums cannot overflow the downcast dtype
+    wide = {c: 'int64' for c in measures if df[c].dtype.kind in 'biu'}
+    cols = dims + measures + ([LINE_COUNT] if LINE_COUNT in df.columns else [])
+    g = df[cols].astype(wide).groupby(dims, dropna=False, observed=True, sort=False)
+    cube = g[measures].sum() if measures else pd.DataFrame(index=g.size().index)
+    cube[LINE_COUNT] = g[LINE_COUNT].sum() if LINE_COUNT in df.columns else g.size()
+    cube = cube.reset_index()
+    for col in dims:
+        if not isinstance(cube[col].dtype, pd.CategoricalDtype):
+            cube[col] = cube[col].astype('category')
+    return cube
+
+def merge_cubes(cubes, col_map: dict) -> pd.DataFrame:
+    cubes = [c for c in cubes if c is not None]
+    if not cubes:
+        return None
+    return build_cube(pd.concat(cubes, ignore_index=True), col_map)
+
+def cell_ids(df: pd.DataFrame, col_map: dict) -> np.ndarray:
+    """Cube row position of every input row (same grouping as build_cube, so orders agree)."""
+    dims = cube_columns(df, col_map)
+    return df.groupby(dims, dropna=False, observed=True, sort=False).ngroup().to_numpy()
+
+def build_cell_sketches(df: pd.DataFrame, col_map: dict, n_cells: int, p: int = hll.DEFAULT_PRECISION):
+    """HyperLogLog sketch of distinct customers per cube cell, aligned with build_cube rows."""
+    cust = col_map.get('customer_id')
+    if not cust or cust not in df.columns:
+        return None
+    return hll.group_sketches(cell_ids(df, col_map), n_cells, df[cust], p)
+
+def merge_cell_sketches(cubes, sketches, col_map: dict, n_cells: int):
+    """Register matrices for concatenated cubes, regrouped onto merge_cubes() cells."""
+    if any(s is None for s in sketches):
+        return None
+    parts = pd.concat([c for c in cubes if c is not None], ignore_index=True)
+    return hll.regroup(np.vstack(sketches), cell_ids(parts, col_map), n_cells)
+
+def is_cube(df) -> bool:
+    return df is not None and LINE_COUNT in df.columns
+
+def can_answer(cube: pd.DataFrame, selections: dict) -> bool:
+    """True when every filtered column is a cube dimension."""
+    return cube is not None and all(col in cube.columns for col in selections)
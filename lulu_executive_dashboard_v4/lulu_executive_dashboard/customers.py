@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+
+# Customer dimension, built once per dataset and indexed by customer id:
+#   first_month - first purchase month (min order_month)
+#   orders      - distinct orders
+#   revenue     - lifetime line value
+#   loyalty     - loyalty flag (max over the customer's lines)
+# Customer KPIs and new-vs-repeat look the filtered rows up here instead of regrouping them.
+# With a categorical id column the rows line up with its categories, so a lookup is the codes.
+
+COLUMNS = ['first_month', 'orders', 'revenue', 'loyalty']
+
+def build_customers(df: pd.DataFrame, col_map: dict):
+    cust = col_map.get('customer_id')
+    if not cust or cust not in df.columns:
+        return None
+    oid = col_map.get('order_id') or ('order_id' if 'order_id' in df.columns else None)
+    rev, loyal = col_map.get('line_value'), col_map.get('loyalty')
+    categorical = isinstance(df[cust].dtype, pd.CategoricalDtype)
+    g = df.groupby(cust, observed=not categorical)
+    dim = pd.DataFrame(index=g.size().index)
+    dim['first_month'] = g['order_month'].min() if 'order_month' in df.columns else None
+    dim['orders'] = (g[oid].nunique() if oid else g.size()).astype('int64')
+    dim['revenue'] = g[rev].sum() if rev in df.columns else 0.0
+    dim['loyalty'] = g[loyal].max().fillna(0).astype('int8') if loyal in df.columns else 0
+    return dim
+
+def merge_customers(a, b):
+    """Dimension over the union of two datasets with disjoint orders (incremental deltas)."""
+    if a is None or b is None:
+        return a if b is None else b
+    g = pd.concat([a, b]).groupby(level=0)
+    return pd.DataFrame({'first_month': g['first_month'].min(), 'orders': g['orders'].sum(),
+                         'revenue': g['revenue'].sum(), 'loyalty': g['loyalty'].max()})
+
+def customer_codes(customers: pd.DataFrame, ids: pd.Series) -> np.ndarray:
+    """Row position of each id in the dimension; -1 for nulls and unknown ids."""
+    if isinstance(ids.dtype, pd.CategoricalDtype) and ids.cat.categories.equals(customers.index):
+        return ids.cat.codes.to_numpy()
+    return customers.index.get_indexer(ids)
+
+def present(customers: pd.DataFrame, ids: pd.Series) -> np.ndarray:
+    """Dimension rows of the customers that occur in ids."""
+    codes = customer_codes(customers, ids)
+    return np.flatnonzero(np.bincount(codes[codes >= 0], minlength=len(customers)))
+
+def lookup_kpis(customers: pd.DataFrame, ids: pd.Series) -> dict:
+    """Unique customers among ids, and the share of them with more than one order overall."""
+    rows = present(customers, ids)
+    orders = customers['orders'].to_numpy()[rows]
+    return {'Unique Customers': len(rows),
+            'Repeat Customer Rate': float((orders > 1).mean()) if len(rows) else float('nan')}
+
+def first_months(customers: pd.DataFrame, ids: pd.Series) -> np.ndarray:
+    codes = customer_codes(customers, ids)
+    first = customers['first_month'].to_numpy()
+    return np.where(codes >= 0, first[codes], None)
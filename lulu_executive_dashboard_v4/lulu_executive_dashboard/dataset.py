@@ -0,0 +1,81 @@
+from pathlib import Path
+from utils import load_typed_csv, standardize_columns, infer_columns, engineer_features
+from snapshot import snapshot_path, read_snapshot, write_snapshot
+from filter_index import build_filter_index, select_rows, FILTERS
+from cube import build_cube, cube_columns, can_answer
+from customers import build_customers
+from time_index import sort_by_time, row_span, DateRange
+from config import INGEST_MODE, SKETCH_MODE, HLL_PRECISION, PUBLISH_DIR
+
+# Data access without Streamlit: the engineered frame for each ingest mode, and the sidebar's
+# selections applied to it. Used by the app's loaders, the warm-up launcher, publish.py, the
+# JSON API (api.py) and the batch renderer (report.py).
+
+BASE_DIR = Path(__file__).parent
+DATA_DIR = BASE_DIR / "data"
+SOURCE = DATA_DIR / "lulu_uae_master_2000.csv"
+METADATA_FILE_NAME = "lulu_uae_master_metadata.csv"
+SNAPSHOT_DIR = DATA_DIR / ".cache"
+STORE_DIR = SNAPSHOT_DIR / "store"
+
+def load_frame(src, metadata_path, snapshot_dir):
+    """(df, col_map) for the in-memory mode: the Parquet snapshot if current, else parse and write it."""
+    snap = snapshot_path(src, snapshot_dir)
+    cached = read_snapshot(snap)
+    if cached is not None:
+        return cached
+    # Metadata CSV declares dtypes: dimensions load as categoricals, flags/ints are downcast.
+    df = load_typed_csv(src, metadata_path)
+    df = standardize_columns(df)
+    col_map = infer_columns(df)
+    df = engineer_features(df, col_map)
+    # rows in time order, so date ranges are slices (time_index.py)
+    df = sort_by_time(df, col_map.get('order_datetime'))
+    write_snapshot(snap, df, col_map)
+    return df, col_map
+
+def filter_columns(df, col_map: dict) -> list:
+    cols = []
+    for key, _ in FILTERS:
+        col = col_map.get(key) or key
+        cols.append(col if col in df.columns else None)
+    return cols
+
+def load_dataset() -> dict:
+    """Frame, col_map, filter index, cube (+ index) and customer dimension for INGEST_MODE."""
+    if INGEST_MODE == "published":
+        from publish import open_version
+        pub = open_version(PUBLISH_DIR)
+        return {'frame': pub['frame'], 'col_map': pub['col_map'], 'filter_index': pub['filter_index'],
+                'cube': pub['cube'], 'cube_index': pub['cube_index'], 'customers': pub['customers']}
+    if INGEST_MODE == "incremental":
+        from incremental import refresh, load_store
+        refresh(DATA_DIR, STORE_DIR, METADATA_FILE_NAME, HLL_PRECISION if SKETCH_MODE else None)
+        df, col_map, cube, _, customers = load_store(STORE_DIR)
+    elif INGEST_MODE == "memory":
+        df, col_map = load_frame(SOURCE, SOURCE.with_name(METADATA_FILE_NAME), SNAPSHOT_DIR)
+        cube = build_cube(df, col_map)
+        customers = build_customers(df, col_map)
+    else:
+        raise ValueError(f"Line-level rows are needed; LULU_INGEST_MODE={INGEST_MODE} is not supported here.")
+    return {'frame': df, 'col_map': col_map, 'filter_index': build_filter_index(df, filter_columns(df, col_map)),
+            'cube': cube, 'cube_index': None if cube is None else build_filter_index(cube, cube_columns(cube, col_map)),
+            'customers': customers}
+
+def filter_frame(frame, index: dict, selections: dict):
+    """Rows of the time-sorted frame matching selections. A date range is a slice view; the
+    bitmaps are then only read for the rows inside it."""
+    span = next((row_span(frame, col, rng) for col, rng in selections.items() if isinstance(rng, DateRange)), None)
+    rows = select_rows(index, selections, span)
+    if rows is not None:
+        return frame.take(rows)
+    return frame if span is None else frame.iloc[span[0]:span[1]]
+
+def select(data: dict, selections: dict) -> tuple:
+    """(filtered rows, aggregate view) of a load_dataset() dict; the view is cube cells when every
+    filter is a cube dimension (so not under a date range), else the filtered rows."""
+    filtered = filter_frame(data['frame'], data['filter_index'], selections)
+    if not can_answer(data['cube'], selections):
+        return filtered, filtered
+    cube_rows = select_rows(data['cube_index'], selections)
+    return filtered, data['cube'] if cube_rows is None else data['cube'].take(cube_rows)
@@ -0,0 +1,182 @@
+import pandas as pd
+import pyarrow as pa
+from cube import LINE_COUNT, cube_columns, cube_measures
+from time_index import DateRange
+
+try:
+    import duckdb
+except ImportError:  # optional backend; config.BACKEND falls back to pandas without it
+    duckdb = None
+
+# SQL versions of the pandas data path. Each function takes the sidebar selections
+# ({column: [labels]}) and pushes them down as a WHERE clause, then returns the same frame
+# shape/dtypes the pandas functions hand to plots.py.
+
+TABLE = "lines"
+CUSTOMERS = "customers"
+
+def connect(df: pd.DataFrame, threads: int = None, customers: pd.DataFrame = None) -> dict:
+    """In-process DuckDB connection with the engineered frame registered as an Arrow table,
+    and the customer dimension (customers.py) next to it when given."""
+    con = duckdb.connect()
+    if threads:
+        con.execute(f"SET threads TO {int(threads)}")
+    con.register(TABLE, pa.Table.from_pandas(df, preserve_index=False))
+    if customers is not None:
+        dim = pd.DataFrame({'cust_id': customers.index.astype(str), 'first_month': customers['first_month'].to_numpy(),
+                            'orders': customers['orders'].to_numpy()})
+        con.register(CUSTOMERS, pa.Table.from_pandas(dim, preserve_index=False))
+    return {
+        'con': con,
+        'columns': list(df.columns),
+        'customers': customers is not None,
+        # reapplied to results so group order and dtypes match the pandas path
+        'categories': {c: df[c].dtype for c in df.columns if isinstance(df[c].dtype, pd.CategoricalDtype)},
+        'numeric': {c: df[c].dtype for c in df.columns if df[c].dtype.kind in 'biuf'},
+    }
+
+def q(col: str) -> str:
+    return '"' + col.replace('"', '""') + '"'
+
+def where(selections: dict, extra=()):
+    """WHERE clause and parameters: labels OR'd within a column, columns AND'ed; a DateRange
+    becomes a half-open range on its column."""
+    clauses, params = list(extra), []
+    for col, labels in selections.items():
+        if isinstance(labels, DateRange):
+            clauses.append(f"{q(col)} >= ? AND {q(col)} < ?")
+            params.extend(t.to_pydatetime() for t in labels)
+        elif labels:
+            clauses.append(f"CAST({q(col)} AS VARCHAR) IN ({', '.join('?' * len(labels))})")
+            params.extend(labels)
+    return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+def distinct_labels(db: dict, col: str) -> list:
+    """Sorted non-null labels of a column, as the sidebar shows them."""
+    rows = db['con'].execute(f"SELECT DISTINCT CAST({q(col)} AS VARCHAR) FROM {TABLE} WHERE {q(col)} IS NOT NULL").fetchall()
+    return sorted(r[0] for r in rows)
+
+def _restore_dtypes(db: dict, out: pd.DataFrame, sums: dict = None) -> pd.DataFrame:
+    """Source categories on key columns. `sums` maps result columns to the source column they
+    sum; a pandas groupby sum keeps that column's dtype, where SQL widens to BIGINT/DOUBLE."""
+    for col, dtype in db['categories'].items():
+        if col in out.columns:
+            out[col] = pd.Categorical(out[col], categories=dtype.categories, ordered=dtype.ordered)
+    for col, src in (sums or {}).items():
+        dtype = db['numeric'].get(src)
+        if col in out.columns and dtype is not None and (dtype.kind == 'f' or out[col].notna().all()):
+            out[col] = out[col].astype(dtype)
+    return out
+
+def group_frame(db: dict, keys, measures, selections: dict, count_col: str = None) -> pd.DataFrame:
+    """SUM of each measure (and optionally COUNT(*)) per key combination, NULL keys kept."""
+    keys = [keys] if isinstance(keys, str) else list(keys)
+    measures = [measures] if isinstance(measures, str) else list(measures)
+    cols = [q(k) for k in keys] + [f"SUM({q(m)}) AS {q(m)}" for m in measures]
+    if count_col:
+        cols.append(f"COUNT(*) AS {q(count_col)}")
+    w, params = where(selections)
+    sql = f"SELECT {', '.join(cols)} FROM {TABLE}{w} GROUP BY ALL"
+    return _restore_dtypes(db, db['con'].execute(sql, params).df(), sums={m: m for m in measures})
+
+def cube(db: dict, col_map: dict, selections: dict) -> pd.DataFrame:
+    """Filtered cube (see cube.build_cube). Any column can be filtered because the WHERE
+    clause runs before grouping."""
+    probe = pd.DataFrame(columns=db['columns'])
+    dims = cube_columns(probe, col_map)
+    measures = [m for m in cube_measures(col_map) if m in db['columns']]
+    out = group_frame(db, dims, measures, selections, count_col=LINE_COUNT)
+    # as build_cube: integer measures widened, every dimension categorical
+    out = out.astype({m: 'int64' for m in measures if out[m].dtype.kind in 'biu'})
+    for col in dims:
+        if not isinstance(out[col].dtype, pd.CategoricalDtype):
+            out[col] = out[col].astype('category')
+    return out
+
+def kpis(db: dict, col_map: dict, selections: dict) -> dict:
+    """Same keys and values as utils.kpis over the filtered rows."""
+    rev, qty, cust = col_map.get('line_value'), col_map.get('quantity'), col_map.get('customer_id')
+    w, params = where(selections)
+    k = {}
+    parts = []
+    if rev:
+        parts += [f"SUM({q(rev)})", f"AVG({q(rev)})"]
+    if qty:
+        parts += [f"SUM({q(qty)})", f"AVG({q(qty)})"]
+    if cust:
+        parts += [f"COUNT(DISTINCT {q(cust)})"]
+    if not parts:
+        return k
+    con = db['con']
+    row = con.execute(f"SELECT {', '.join(parts)} FROM {TABLE}{w}", params).fetchone()
+    as_float = lambda v: float('nan') if v is None else float(v)
+    vals = iter(row)
+    if rev:
+        k['Total Revenue (AED)'] = float(next(vals) or 0)
+        k['Avg Order Value (AED)'] = as_float(next(vals))
+    if qty:
+        k['Total Units Sold'] = float(next(vals) or 0)
+        k['Avg Units per Order'] = as_float(next(vals))
+    if cust:
+        k['Unique Customers'] = int(next(vals))
+        w2, params2 = where(selections, extra=[f"{q(cust)} IS NOT NULL"])
+        if db.get('customers'):
+            # lifetime order counts of the filtered customers, from the dimension
+            rc = con.execute(f"SELECT AVG(CASE WHEN c.orders > 1 THEN 1.0 ELSE 0.0 END) FROM "
+                             f"(SELECT DISTINCT CAST({q(cust)} AS VARCHAR) AS cust_id FROM {TABLE}{w2}) f "
+                             f"JOIN {CUSTOMERS} c USING (cust_id)", params2).fetchone()[0]
+        else:
+            rc = con.execute(f"SELECT AVG(CASE WHEN n > 1 THEN 1.0 ELSE 0.0 END) FROM "
+                             f"(SELECT COUNT(*) AS n FROM {TABLE}{w2} GROUP BY {q(cust)})", params2).fetchone()[0]
+        k['Repeat Customer Rate'] = as_float(rc)
+    return k
+
+def _order_keys(db: dict, col_map: dict):
+    columns = db['columns']
+    oid = col_map.get('order_id') or ('order_id' if 'order_id' in columns else None)
+    gcols = [oid] if oid else []
+    if 'order_month' in columns:
+        gcols.append('order_month')
+    if col_map.get('customer_id'):
+        gcols.append(col_map['customer_id'])
+    return oid, gcols
+
+def _per_order_sql(col_map: dict, gcols, selections: dict):
+    rev, qty = col_map.get('line_value'), col_map.get('quantity')
+    cols = [q(c) for c in gcols] + [f"SUM({q(rev)}) AS order_revenue"]
+    if qty:
+        cols.append(f"CAST(SUM({q(qty)}) AS BIGINT) AS order_units")
+    # pandas groupby drops rows with a null key
+    w, params = where(selections, extra=[f"{q(c)} IS NOT NULL" for c in gcols])
+    return f"SELECT {', '.join(cols)} FROM {TABLE}{w} GROUP BY ALL", params
+
+def _per_order_sums(col_map: dict) -> dict:
+    return {'order_revenue': col_map.get('line_value'), 'order_units': col_map.get('quantity')}
+
+def per_order_metrics(db: dict, col_map: dict, selections: dict):
+    """SQL twin of utils.per_order_metrics."""
+    oid, gcols = _order_keys(db, col_map)
+    if oid is None or col_map.get('line_value') is None:
+        return None
+    sql, params = _per_order_sql(col_map, gcols, selections)
+    order = ', '.join(q(c) for c in gcols)
+    return _restore_dtypes(db, db['con'].execute(f"{sql} ORDER BY {order}", params).df(), _per_order_sums(col_map))
+
+def new_vs_repeat_by_month(db: dict, col_map: dict, selections: dict):
+    """SQL twin of utils.new_vs_repeat_by_month: (per-order frame, monthly summary)."""
+    oid, gcols = _order_keys(db, col_map)
+    cust = col_map.get('customer_id')
+    if oid is None or col_map.get('line_value') is None or cust is None or 'order_month' not in gcols:
+        return None
+    sql, params = _per_order_sql(col_map, gcols, selections)
+    if db.get('customers'):
+        flagged = (f"WITH per AS ({sql}) SELECT per.*, c.first_month, CAST(per.order_month = c.first_month AS BIGINT) AS is_new "
+                   f"FROM per LEFT JOIN {CUSTOMERS} c ON CAST(per.{q(cust)} AS VARCHAR) = c.cust_id")
+    else:
+        flagged = (f"WITH per AS ({sql}) SELECT *, MIN(order_month) OVER (PARTITION BY {q(cust)}) AS first_month, "
+                   f"CAST(order_month = MIN(order_month) OVER (PARTITION BY {q(cust)}) AS BIGINT) AS is_new FROM per")
+    con = db['con']
+    per = con.execute(f"{flagged} ORDER BY {', '.join(q(c) for c in gcols)}", params).df()
+    summary = con.execute(f"SELECT order_month, AVG(is_new) AS new_customer_share, COUNT(*) AS orders "
+                          f"FROM ({flagged}) GROUP BY order_month ORDER BY order_month", params).df()
+    return _restore_dtypes(db, per, _per_order_sums(col_map)), summary
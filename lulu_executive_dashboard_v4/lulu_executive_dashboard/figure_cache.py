@@ -0,0 +1,71 @@
+import threading
+from collections import OrderedDict
+from lazy import LazyModule
+
+pio = LazyModule('plotly.io')
+
+def selection_key(selections: dict) -> tuple:
+    """Order-insensitive, hashable form of the sidebar selections ({col: [labels]})."""
+    return tuple(sorted((col, tuple(sorted(labels))) for col, labels in selections.items() if labels))
+
+def _size(entry) -> int:
+    payload, note = entry
+    return len(payload or b'') + len((note or '').encode())
+
+class FigureCache:
+    """Process-wide LRU of serialized figures keyed by (chart id, selection key, dataset version).
+
+    Entries are the plotly JSON plus the outcome note; the least recently used ones are evicted
+    once the stored bytes exceed max_bytes. Shared across sessions and chart threads.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """(fig, note) for a cached chart, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        payload, note = entry
+        return (None if payload is None else pio.from_json(payload.decode())), note
+
+    def put(self, key, fig, note):
+        entry = (None if fig is None else fig.to_json().encode(), note)
+        size = _size(entry)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= _size(old)
+            self._entries[key] = entry
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.bytes -= _size(evicted)
+                self.evictions += 1
+
+    def __len__(self):
+        return len(self._entries)
+
+def cached_chart(cache: FigureCache, key, fn, *args, **kwargs):
+    """fn(*args, **kwargs) -> (fig, note), answered from the cache when key was built before."""
+    if cache is None:
+        return fn(*args, **kwargs)
+    hit = cache.get(key)
+    if hit is not None:
+        return hit
+    fig, note = fn(*args, **kwargs)
+    cache.put(key, fig, note)
+    return fig, note
@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+
+# Sidebar filters: (column key, label).
+FILTERS = [
+    ('city', "City"),
+    ('department', "Department"),
+    ('category', "Category"),
+    ('brand', "Brand"),
+    ('channel', "Channel"),
+    ('gender', "Gender"),
+    ('age_group', "Age Group"),
+    ('store_format', "Store Format"),
+    ('nationality_group', "Nationality Group"),
+]
+
+def build_filter_index(df: pd.DataFrame, cols) -> dict:
+    """Packed row bitmask per (column, value), keyed by the string label shown in the sidebar."""
+    n = len(df)
+    index = {'n_rows': n, 'columns': {}}
+    for col in cols:
+        if col is None or col not in df.columns:
+            continue
+        s = df[col]
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            codes, uniques = s.cat.codes.to_numpy(), s.cat.categories
+        else:
+            codes, uniques = pd.factorize(s)
+        # one pass to bucket rows by code instead of one full comparison per value
+        order = np.argsort(codes, kind='stable')
+        bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+        bitmaps = {}
+        for i, value in enumerate(uniques):
+            rows = order[bounds[i]:bounds[i + 1]]
+            if len(rows) == 0:
+                continue
+            bits = np.zeros(n, dtype=bool)
+            bits[rows] = True
+            bitmaps[str(value)] = np.packbits(bits)
+        index['columns'][col] = bitmaps
+    return index
+
+def select_rows(index: dict, selections: dict, span: tuple = None):
+    """Row positions matching {col: [labels]}: OR within a column, AND across columns.
+
+    Returns None when no column is filtered, so callers can keep the unfiltered frame as-is.
+    span=(lo, hi) keeps rows lo..hi-1 only (a date range on the time-sorted frame, see
+    time_index.row_span) and reads just the bitmap bytes covering them.
+    """
+    n = index['n_rows']
+    lo, hi = span if span is not None else (0, n)
+    hi = max(lo, hi)
+    b0, b1 = lo // 8, (hi + 7) // 8
+    mask = None
+    for col, labels in selections.items():
+        bitmaps = index['columns'].get(col)
+        if bitmaps is None or not labels:
+            continue
+        col_bits = np.zeros(b1 - b0, dtype=np.uint8)
+        for label in labels:
+            bits = bitmaps.get(label)
+            if bits is not None:
+                np.bitwise_or(col_bits, bits[b0:b1], out=col_bits)
+        mask = col_bits if mask is None else np.bitwise_and(mask, col_bits, out=mask)
+    if mask is None:
+        return None
+    return np.flatnonzero(np.unpackbits(mask, count=hi - b0 * 8)[lo - b0 * 8:]) + lo
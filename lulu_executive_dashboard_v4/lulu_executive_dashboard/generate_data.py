@@ -0,0 +1,207 @@
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from utils import read_schema
+
+# Synthetic Lulu lines for load testing. learn() turns the sample CSV into empirical tables
+# (joint tuples for columns that move together, conditionals for department -> product, etc.);
+# generate() samples them with vectorized numpy, one partition file per worker task.
+
+# Column groups sampled as joint tuples, optionally conditioned on an already sampled column.
+JOINT = [
+    ('channel_mix', None, ['channel', 'store_format', 'device_type', 'delivery_type', 'payment_method']),
+    ('location', None, ['city', 'city_zone']),
+    ('department', 'channel', ['department']),
+    ('product', 'department', ['category', 'brand']),
+    ('promo', 'department', ['promo_used', 'promo_code_type', 'ad_channel', 'campaign']),
+    ('quantity', 'department', ['quantity']),
+    ('returns', None, ['returned', 'return_reason']),
+]
+# Fixed per customer; sampled from a hash of the customer number so every process agrees.
+CUSTOMER = ['age', 'gender', 'nationality_group', 'loyalty_member']
+# Hash salts for the per-customer draws.
+ATTRIBUTES, ORDER_COUNT = 0, 1
+
+def _table(frame: pd.DataFrame, cols) -> dict:
+    counts = frame[cols].value_counts(dropna=False, normalize=True)
+    return {'rows': counts.index.to_frame(index=False), 'p': counts.to_numpy()}
+
+def learn(sample_csv, metadata_csv=None) -> dict:
+    """Empirical model of the sample: joint/conditional tables, per-category log-price moments,
+    discount and return ratios, month/hour mix, orders per customer."""
+    df = pd.read_csv(sample_csv)
+    schema = read_schema(metadata_csv) if metadata_csv and Path(metadata_csv).exists() else {}
+    ts = pd.to_datetime(df['order_datetime'], format='mixed')
+    model = {'columns': list(df.columns), 'schema': schema, 'tables': {}, 'conditional': {}}
+    for name, given, cols in JOINT:
+        if given is None:
+            model['tables'][name] = _table(df, cols)
+        else:
+            model['conditional'][name] = (given, {key: _table(g, cols) for key, g in df.groupby(given)})
+    model['tables']['customer'] = _table(df, CUSTOMER)
+    model['tables']['orders'] = _table(df.groupby('user_id')['order_id'].nunique().to_frame('orders'), ['orders'])
+    model['tables']['basket'] = _table(df, ['basket_size_items'])
+    model['tables']['stock_out'] = _table(df, ['stock_out_flag'])
+    model['tables']['month'] = _table(ts.dt.to_period('M').astype(str).to_frame('month'), ['month'])
+    model['tables']['hour'] = _table(ts.dt.hour.to_frame('hour'), ['hour'])
+    logp = np.log(df['base_unit_price_aed'])
+    model['price'] = logp.groupby(df['category']).agg(['mean', 'std']).fillna({'std': 0.1}).to_dict('index')
+    promo = df['promo_used'] == 1
+    model['discount_frac'] = (df['discount_aed'] / df['base_unit_price_aed'])[promo].to_numpy()
+    returned = df['returned'] == 1
+    model['return_frac'] = (df['return_value_aed'] / df['line_value_aed'])[returned].clip(0, 1).to_numpy()
+    model['order_prefix'] = re.match(r'[A-Za-z]+-', str(df['order_id'].iloc[0])).group(0)
+    model['customer_prefix'] = re.match(r'[A-Za-z]+-', str(df['user_id'].iloc[0])).group(0)
+    return model
+
+def _draw(rng, table: dict, n: int) -> pd.DataFrame:
+    idx = rng.choice(len(table['p']), size=n, p=table['p'])
+    return table['rows'].iloc[idx].reset_index(drop=True)
+
+def _draw_given(rng, given: np.ndarray, tables: dict) -> pd.DataFrame:
+    parts = []
+    for key in pd.unique(given):
+        pos = np.flatnonzero(given == key)
+        part = _draw(rng, tables[key], len(pos))
+        part.index = pos
+        parts.append(part)
+    return pd.concat(parts).sort_index()
+
+def _hashed_uniform(ids: np.ndarray, salt: int) -> np.ndarray:
+    # splitmix64 finalizer: a fixed uniform in [0, 1) per id, identical in every process
+    with np.errstate(over='ignore'):
+        z = ids.astype(np.uint64) + np.uint64(0x9E3779B97F4A7C15 * (salt + 1) % 2 ** 64)
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        z = z ^ (z >> np.uint64(31))
+    return (z >> np.uint64(11)).astype(np.float64) / 2.0 ** 53
+
+def _hashed_draw(table: dict, ids: np.ndarray, salt: int) -> pd.DataFrame:
+    pos = np.searchsorted(np.cumsum(table['p']), _hashed_uniform(ids, salt), side='right')
+    return table['rows'].iloc[pos.clip(max=len(table['p']) - 1)].reset_index(drop=True)
+
+def _customers(rng, model: dict, n: int, start: int) -> np.ndarray:
+    """Customer number of each of n lines. Customers are numbered from `start` and each takes
+    as many lines as its order count, drawn from the sample's orders-per-customer table, so
+    partitions never share a customer and repeat rates follow the sample."""
+    ids = start + np.arange(n, dtype=np.int64)
+    orders = _hashed_draw(model['tables']['orders'], ids, ORDER_COUNT)['orders'].to_numpy()
+    used = int(np.searchsorted(np.cumsum(orders), n)) + 1  # every customer has an order, so used <= n
+    return rng.permutation(np.repeat(ids[:used], orders[:used])[:n])
+
+def generate_partition(model: dict, n: int, start: int, seed: int) -> pd.DataFrame:
+    """n synthetic lines numbered from `start`."""
+    rng = np.random.default_rng([seed, start])
+    t = model['tables']
+    out = {}
+    labels = t['month']['rows']['month'].to_numpy()
+    starts = pd.to_datetime(labels, format='%Y-%m')
+    pick = rng.choice(len(labels), size=n, p=t['month']['p'])
+    month, first, days = labels[pick], starts[pick], starts.days_in_month.to_numpy()[pick]
+    ts = (first + pd.to_timedelta(rng.integers(0, days), unit='D')
+          + pd.to_timedelta(_draw(rng, t['hour'], n)['hour'].to_numpy(), unit='h')
+          + pd.to_timedelta(rng.integers(0, 60, n), unit='m'))
+    out['order_id'] = pd.Series(np.arange(start + 1, start + n + 1)).map(f"{model['order_prefix']}{{:09d}}".format)
+    out['order_datetime'] = ts
+    frame = pd.concat([_draw(rng, t['channel_mix'], n), _draw(rng, t['location'], n)], axis=1)
+    for name in ('department', 'product', 'promo', 'quantity'):
+        given, tables = model['conditional'][name]
+        frame = pd.concat([frame, _draw_given(rng, frame[given].to_numpy(), tables)], axis=1)
+    frame = pd.concat([frame, _draw(rng, t['returns'], n), _draw(rng, t['basket'], n), _draw(rng, t['stock_out'], n)], axis=1)
+
+    moments = pd.DataFrame.from_dict(model['price'], orient='index')
+    mu = moments['mean'].reindex(frame['category']).to_numpy()
+    sd = moments['std'].reindex(frame['category']).to_numpy()
+    base = np.round(np.exp(rng.normal(mu, sd)), 2)
+    promo = frame['promo_used'].to_numpy() == 1
+    discount = np.where(promo, np.round(base * rng.choice(model['discount_frac'], n), 2), 0.0)
+    unit = np.round(base - discount, 2)
+    qty = frame['quantity'].to_numpy()
+    line = np.round(unit * qty, 2)
+    returned = frame['returned'].to_numpy() == 1
+    refund = np.where(returned, np.round(line * rng.choice(model['return_frac'], n), 2), 0.0)
+
+    cust = _customers(rng, model, n, start)
+    who = _hashed_draw(t['customer'], cust, ATTRIBUTES)
+
+    for col in frame.columns:
+        out[col] = frame[col].to_numpy()
+    out['sku_id'] = pd.Series(rng.integers(100000, 1000000, n)).map("SKU-{:06d}".format)
+    out['base_unit_price_aed'] = base
+    out['discount_aed'] = discount
+    out['unit_price_after_discount_aed'] = unit
+    out['line_value_aed'] = line
+    out['return_value_aed'] = refund
+    out['user_id'] = pd.Series(cust + 1).map(f"{model['customer_prefix']}{{:08d}}".format)
+    for col in CUSTOMER:
+        out[col] = who[col].to_numpy()
+    out['hour_of_day'] = ts.hour
+    out['day_of_week'] = ts.day_name()
+    out['order_month'] = month
+    df = pd.DataFrame(out)[model['columns']]
+    for col in df.columns:
+        if model['schema'].get(col) == 'category':
+            df[col] = df[col].astype('category')
+    return df
+
+def _write_partition(task):
+    model, n, start, seed, path, fmt = task
+    df = generate_partition(model, n, start, seed)
+    if fmt == 'parquet':
+        df.to_parquet(path, index=False)
+    else:
+        df['order_datetime'] = df['order_datetime'].dt.strftime('%m/%d/%Y %H:%M')
+        df.to_csv(path, index=False)
+    return path, n
+
+def bytes_per_row(model: dict, fmt: str, out_dir: Path, probe_rows: int = 20000) -> float:
+    path, _ = _write_partition((model, probe_rows, 0, 0, out_dir / f"_probe.{fmt}", fmt))
+    size = path.stat().st_size
+    path.unlink()
+    return size / probe_rows
+
+def generate(model: dict, rows: int, out_dir, fmt: str = 'parquet', partition_rows: int = 1_000_000,
+             workers: int = None, seed: int = 0) -> list:
+    """Write `rows` lines as part-NNNNN.<fmt> files under out_dir using a process pool."""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    tasks = []
+    for i, start in enumerate(range(0, rows, partition_rows)):
+        n = min(partition_rows, rows - start)
+        tasks.append((model, n, start, seed, out_dir / f"part-{i:05d}.{fmt}", fmt))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_write_partition, tasks))
+
+def parse_size(text: str) -> int:
+    m = re.fullmatch(r'\s*([\d.]+)\s*([KMGT]?)B?\s*', text.upper())
+    if not m:
+        raise ValueError(f"Unrecognized size: {text}")
+    return int(float(m.group(1)) * 1024 ** ' KMGT'.index(m.group(2) or ' '))
+
+if __name__ == "__main__":
+    import argparse
+    base = Path(__file__).parent / "data"
+    ap = argparse.ArgumentParser(description="Generate synthetic Lulu lines that follow the sample's distributions.")
+    ap.add_argument("out_dir")
+    target = ap.add_mutually_exclusive_group(required=True)
+    target.add_argument("--rows", type=int)
+    target.add_argument("--size", help="target output size, e.g. 500MB or 20GB")
+    ap.add_argument("--format", choices=["parquet", "csv"], default="parquet")
+    ap.add_argument("--partition-rows", type=int, default=1_000_000)
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--sample", default=str(base / "lulu_uae_master_2000.csv"))
+    ap.add_argument("--metadata", default=str(base / "lulu_uae_master_metadata.csv"))
+    args = ap.parse_args()
+    model = learn(args.sample, args.metadata)
+    rows = args.rows
+    if rows is None:
+        Path(args.out_dir).mkdir(parents=True, exist_ok=True)
+        rows = int(parse_size(args.size) / bytes_per_row(model, args.format, Path(args.out_dir)))
+    t = time.perf_counter()
+    parts = generate(model, rows, args.out_dir, args.format, args.partition_rows, args.workers, args.seed)
+    size = sum(Path(p).stat().st_size for p, _ in parts)
+    print(f"{rows:,} rows in {len(parts)} files, {size / 1e6:,.1f} MB, {time.perf_counter() - t:.1f}s")
@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+
+# HyperLogLog distinct counting. A sketch is 2**p uint8 registers; sketches merge with an
+# elementwise max, so per-cell sketches can be combined for any filter at query time.
+
+DEFAULT_PRECISION = 10
+
+def std_error(p: int = DEFAULT_PRECISION) -> float:
+    return 1.04 / np.sqrt(2 ** p)
+
+def hash_values(values) -> np.ndarray:
+    """64-bit hashes of the non-null values (stable across processes)."""
+    s = pd.Series(values).dropna()
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        s = s.astype(str)
+    return pd.util.hash_pandas_object(s, index=False).to_numpy(np.uint64)
+
+def _index_and_rank(hashes: np.ndarray, p: int):
+    idx = (hashes >> np.uint64(64 - p)).astype(np.int64)
+    rest = hashes & np.uint64((1 << (64 - p)) - 1)
+    # rank = position of the leftmost 1-bit in the remaining 64-p bits (frexp gives bit length)
+    _, bit_len = np.frexp(rest.astype(np.float64))
+    rank = np.where(rest == 0, 64 - p + 1, 64 - p - bit_len + 1).astype(np.uint8)
+    return idx, rank
+
+def sketch(values, p: int = DEFAULT_PRECISION) -> np.ndarray:
+    regs = np.zeros(2 ** p, dtype=np.uint8)
+    idx, rank = _index_and_rank(hash_values(values), p)
+    np.maximum.at(regs, idx, rank)
+    return regs
+
+def group_sketches(group_ids, n_groups: int, values, p: int = DEFAULT_PRECISION) -> np.ndarray:
+    """One sketch per group: returns an (n_groups, 2**p) register matrix."""
+    group_ids = np.asarray(group_ids)
+    keep = pd.notna(pd.Series(values)).to_numpy()
+    idx, rank = _index_and_rank(hash_values(pd.Series(values)[keep]), p)
+    return max_registers(group_ids[keep], n_groups, idx, rank, p)
+
+def max_registers(group_ids, n_groups: int, idx, rank, p: int) -> np.ndarray:
+    m = 2 ** p
+    regs = np.zeros((n_groups, m), dtype=np.uint8)
+    if len(rank):
+        # groupby-max on the flat (group, register) key is far faster than np.maximum.at
+        best = pd.Series(rank).groupby(np.asarray(group_ids, dtype=np.int64) * m + idx).max()
+        flat = best.index.to_numpy()
+        regs[flat // m, flat % m] = best.to_numpy()
+    return regs
+
+def regroup(sketches: np.ndarray, group_ids, n_groups: int) -> np.ndarray:
+    """Merge rows of a register matrix that share a new group id."""
+    p = int(np.log2(sketches.shape[1]))
+    rows, regs = np.nonzero(sketches)
+    return max_registers(np.asarray(group_ids)[rows], n_groups, regs, sketches[rows, regs], p)
+
+def merge(sketches: np.ndarray) -> np.ndarray:
+    sketches = np.atleast_2d(sketches)
+    if sketches.shape[0] == 0:
+        return np.zeros(sketches.shape[1], dtype=np.uint8)
+    return sketches.max(axis=0)
+
+def estimate(regs: np.ndarray) -> float:
+    m = regs.shape[-1]
+    alpha = 0.7213 / (1 + 1.079 / m)
+    raw = alpha * m * m / np.sum(np.ldexp(1.0, -regs.astype(np.int64)))
+    zeros = int(np.count_nonzero(regs == 0))
+    if raw <= 2.5 * m and zeros:
+        return float(m * np.log(m / zeros))  # linear counting for small cardinalities
+    return float(raw)
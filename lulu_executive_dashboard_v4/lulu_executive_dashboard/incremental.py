@@ -0,0 +1,160 @@
+import hashlib
+import io
+import json
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from utils import load_typed_csv, standardize_columns, infer_columns, engineer_features
+from cube import build_cube, merge_cubes, build_cell_sketches, merge_cell_sketches
+from customers import build_customers, merge_customers
+from time_index import sort_by_time
+
+# Append-only store for nightly CSV drops:
+#   manifest.json    - col_map, parts, and per source file the byte offset already ingested
+#   parts/*.parquet  - engineered rows, one part per ingested delta
+#   cube.parquet     - cube.build_cube() cells, merged in place
+#   sketches.npy     - optional per-cell HyperLogLog registers aligned with cube.parquet
+#   customers.parquet - customer dimension (customers.py), merged in place
+# The manifest is written last, so an interrupted refresh just redoes the same delta.
+
+STORE_VERSION = 2
+EDGE_BYTES = 4096  # bytes hashed at the start and end of the ingested prefix
+
+def _edge_digest(path, offset):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        h.update(f.read(min(EDGE_BYTES, offset)))
+        f.seek(max(0, offset - EDGE_BYTES))
+        h.update(f.read(min(EDGE_BYTES, offset)))
+    return h.hexdigest()
+
+def _read_delta(path, offset):
+    """Header plus complete lines after `offset`; returns (bytes, new_offset)."""
+    with open(path, "rb") as f:
+        header = f.readline()
+        start = max(offset, len(header))
+        f.seek(start)
+        body = f.read()
+    end = body.rfind(b"\n") + 1  # leave a half-written last line for the next run
+    return header + body[:end], start + end
+
+def source_files(data_dir, metadata_name):
+    return sorted(p for p in Path(data_dir).glob("*.csv") if p.name != metadata_name)
+
+def _write_atomic(path, write):
+    tmp = path.with_name(path.name + ".tmp")
+    write(tmp)
+    tmp.replace(path)
+
+def _save_npy(path, arr):
+    with open(path, "wb") as f:
+        np.save(f, arr)
+
+def _read_manifest(store):
+    path = store / "manifest.json"
+    if not path.exists():
+        return None
+    manifest = json.loads(path.read_text())
+    return manifest if manifest.get("version") == STORE_VERSION else None
+
+def _update_customers(customers, delta, col_map):
+    part = build_customers(delta, col_map)
+    if part is None:
+        return customers
+    # plain ids, so parts whose categoricals differ still line up
+    part.index = pd.Index(part.index.to_numpy(), name=part.index.name)
+    return merge_customers(customers, part)
+
+def refresh(data_dir, store_dir, metadata_name, sketch_precision=None) -> dict:
+    """Ingest new files and appended rows into the store; rebuild it if a known file was rewritten."""
+    store = Path(store_dir)
+    (store / "parts").mkdir(parents=True, exist_ok=True)
+    manifest = _read_manifest(store)
+    if manifest is not None and manifest.get("sketch_precision") != sketch_precision:
+        manifest = None
+    files = source_files(data_dir, metadata_name)
+    if manifest is not None:
+        for name, seen in manifest["files"].items():
+            p = Path(data_dir) / name
+            if not p.exists() or p.stat().st_size < seen["offset"] or _edge_digest(p, seen["offset"]) != seen["digest"]:
+                manifest = None  # history changed underneath us: start over
+                break
+    rebuilt = manifest is None
+    if rebuilt:
+        for old in (store / "parts").glob("*.parquet"):
+            old.unlink()
+        manifest = {"version": STORE_VERSION, "col_map": None, "files": {}, "parts": [],
+                    "rows": 0, "sketch_precision": sketch_precision}
+        cube, sketches, customers = None, None, None
+    else:
+        cube = pd.read_parquet(store / "cube.parquet") if (store / "cube.parquet").exists() else None
+        sketches = np.load(store / "sketches.npy") if sketch_precision and (store / "sketches.npy").exists() else None
+        customers = pd.read_parquet(store / "customers.parquet") if (store / "customers.parquet").exists() else None
+
+    metadata_path = Path(data_dir) / metadata_name
+    col_map = manifest["col_map"]
+    added = 0
+    for p in files:
+        seen = manifest["files"].get(p.name, {"offset": 0})
+        if p.stat().st_size <= seen["offset"]:
+            continue
+        raw, offset = _read_delta(p, seen["offset"])
+        if offset > seen["offset"] and raw.count(b"\n") > 1:
+            delta = standardize_columns(load_typed_csv(io.BytesIO(raw), metadata_path))
+            if col_map is None:
+                col_map = infer_columns(delta)
+            delta = engineer_features(delta, col_map)
+            part = store / "parts" / f"part-{len(manifest['parts']):06d}.parquet"
+            _write_atomic(part, lambda t: pq.write_table(pa.Table.from_pandas(delta, preserve_index=False), t))
+            manifest["parts"].append(part.name)
+            delta_cube = build_cube(delta, col_map)
+            if sketch_precision and delta_cube is not None:
+                delta_sk = build_cell_sketches(delta, col_map, len(delta_cube), sketch_precision)
+                merged = merge_cubes([cube, delta_cube], col_map)
+                sketches = delta_sk if cube is None else merge_cell_sketches([cube, delta_cube], [sketches, delta_sk], col_map, len(merged))
+                cube = merged
+            else:
+                cube = merge_cubes([cube, delta_cube], col_map)
+            customers = _update_customers(customers, delta, col_map)
+            added += len(delta)
+        manifest["files"][p.name] = {"offset": offset, "digest": _edge_digest(p, offset)}
+
+    if added or rebuilt:
+        if cube is not None:
+            _write_atomic(store / "cube.parquet", lambda t: cube.to_parquet(t, index=False))
+        if sketches is not None:
+            _write_atomic(store / "sketches.npy", lambda t: _save_npy(t, sketches))
+        if customers is not None:
+            _write_atomic(store / "customers.parquet", lambda t: customers.to_parquet(t))
+    manifest["col_map"] = col_map
+    manifest["rows"] += added
+    _write_atomic(store / "manifest.json", lambda t: t.write_text(json.dumps(manifest, indent=1)))
+    return {"rebuilt": rebuilt, "rows_added": added, "rows_total": manifest["rows"], "parts": len(manifest["parts"])}
+
+def load_store(store_dir):
+    """Return (df, col_map, cube, sketches, customers) from a refreshed store."""
+    store = Path(store_dir)
+    manifest = _read_manifest(store)
+    if manifest is None or not manifest["parts"]:
+        raise FileNotFoundError(f"No ingested data in {store}; run refresh() first.")
+    tables = [pq.read_table(store / "parts" / name, memory_map=True) for name in manifest["parts"]]
+    df = pa.concat_tables(tables, promote_options="permissive").to_pandas()
+    # parts are in arrival order; date ranges need the rows in time order (time_index.py)
+    df = sort_by_time(df, manifest["col_map"].get('order_datetime'))
+    cube = pd.read_parquet(store / "cube.parquet")
+    sketches = np.load(store / "sketches.npy") if (store / "sketches.npy").exists() and manifest.get("sketch_precision") else None
+    customers = pd.read_parquet(store / "customers.parquet") if (store / "customers.parquet").exists() else None
+    return df, manifest["col_map"], cube, sketches, customers
+
+if __name__ == "__main__":
+    import argparse
+    from config import HLL_PRECISION, SKETCH_MODE
+    base = Path(__file__).parent
+    ap = argparse.ArgumentParser(description="Ingest new or appended CSV rows from data/ into the incremental store.")
+    ap.add_argument("--data-dir", default=str(base / "data"))
+    ap.add_argument("--store-dir", default=str(base / "data" / ".cache" / "store"))
+    ap.add_argument("--metadata", default="lulu_uae_master_metadata.csv")
+    args = ap.parse_args()
+    print(refresh(args.data_dir, args.store_dir, args.metadata, HLL_PRECISION if SKETCH_MODE else None))
@@ -0,0 +1,120 @@
+import json
+import threading
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+import pandas as pd
+
+def output_rows(result) -> int:
+    """Rows produced by a stage: frame/series length, dict size, or data points of a (fig, note)."""
+    if result is None:
+        return 0
+    if isinstance(result, (pd.DataFrame, pd.Series, dict, list)):
+        return len(result)
+    if isinstance(result, tuple) and result:
+        fig = result[0]
+        if hasattr(fig, 'data'):
+            total = 0
+            for trace in fig.data:
+                for attr in ('x', 'values', 'z'):
+                    v = getattr(trace, attr, None)
+                    if v is not None:
+                        total += len(v)
+                        break
+            return total
+        return output_rows(fig)
+    return 0
+
+def owned_bytes(objs, shared=()) -> int:
+    """Deep size of the frames/series/arrays in objs (nested in dicts, lists and tuples), skipping
+    the shared objects themselves, e.g. the process-wide dataset when no filter is active."""
+    shared_ids = {id(o) for o in shared}
+    seen, total = set(), 0
+    def visit(o):
+        nonlocal total
+        if o is None or id(o) in shared_ids or id(o) in seen:
+            return
+        seen.add(id(o))
+        if isinstance(o, pd.DataFrame):
+            total += int(o.memory_usage(index=True, deep=True).sum())
+        elif isinstance(o, (pd.Series, pd.Index)):
+            total += int(o.memory_usage(deep=True))
+        elif hasattr(o, 'nbytes'):
+            total += int(o.nbytes)
+        elif isinstance(o, dict):
+            for v in o.values():
+                visit(v)
+        elif isinstance(o, (list, tuple)):
+            for v in o:
+                visit(v)
+    for o in objs:
+        visit(o)
+    return total
+
+class PerfRecorder:
+    """Stage timings for one rerun: wall time, CPU time of the calling thread, peak traced
+    allocation and output rows.
+
+    Disabled recorders only call through. Peak allocation uses tracemalloc, which is process-wide,
+    so with concurrent chart threads a stage's peak also includes work overlapping it.
+    """
+
+    def __init__(self, enabled: bool = True, trace_memory: bool = True):
+        self.enabled = enabled
+        self.rerun = uuid.uuid4().hex[:12]
+        self.records = []
+        self._lock = threading.Lock()
+        self.trace_memory = enabled and trace_memory
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextmanager
+    def stage(self, name: str):
+        if not self.enabled:
+            yield {}
+            return
+        rec = {'stage': name, 'thread': threading.current_thread().name}
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        wall, cpu = time.perf_counter(), time.thread_time()
+        try:
+            yield rec
+        finally:
+            rec['wall_ms'] = (time.perf_counter() - wall) * 1000
+            rec['cpu_ms'] = (time.thread_time() - cpu) * 1000
+            if self.trace_memory:
+                rec['peak_mb'] = max(tracemalloc.get_traced_memory()[1] - base, 0) / 2 ** 20
+            with self._lock:
+                self.records.append(rec)
+
+    def call(self, name: str, fn, *args, **kwargs):
+        if not self.enabled:
+            return fn(*args, **kwargs)
+        with self.stage(name) as rec:
+            out = fn(*args, **kwargs)
+            rec['rows'] = output_rows(out)
+        return out
+
+    def wrap(self, name: str, fn):
+        if not self.enabled:
+            return fn
+        return lambda *args, **kwargs: self.call(name, fn, *args, **kwargs)
+
+    def frame(self) -> pd.DataFrame:
+        cols = ['stage', 'wall_ms', 'cpu_ms', 'peak_mb', 'rows', 'thread']
+        return pd.DataFrame(self.records, columns=cols)
+
+    def write_jsonl(self, path, **context):
+        """Append one JSON line per stage, tagged with the rerun id and any context (session, filters)."""
+        if not self.enabled or not self.records:
+            return
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        ts = datetime.now(timezone.utc).isoformat(timespec='milliseconds')
+        with open(path, 'a', encoding='utf-8') as f:
+            for rec in self.records:
+                f.write(json.dumps({'ts': ts, 'rerun': self.rerun, **context, **rec}, default=str) + '\n')
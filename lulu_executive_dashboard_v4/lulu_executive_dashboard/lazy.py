@@ -0,0 +1,29 @@
+import importlib
+import threading
+
+# one lock for every lazy module: plotly.express and plotly.graph_objects import overlapping
+# submodules, and two threads importing them at once can see each other's half-initialized modules
+_IMPORT_LOCK = threading.RLock()
+
+class LazyModule:
+    """Stand-in for `import name` that imports on first attribute access.
+
+    Keeps heavy libraries (plotly.express alone is ~0.2 s) off the import path of modules that
+    may never draw a figure; warmup.py imports them ahead of the first session instead.
+    The first import is serialized, so chart threads can share one instance.
+    """
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            with _IMPORT_LOCK:
+                if self._module is None:
+                    self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
@@ -0,0 +1,68 @@
+import threading
+import pandas as pd
+
+class AggregationPlanner:
+    """Per-rerun memo of groupby aggregates over one frame.
+
+    Chart functions ask for (keys, measure, agg); each distinct request is computed once and
+    shared between the figure and its narrative. A sum over a subset of keys that were already
+    aggregated is rolled up from that smaller result instead of rescanning the frame.
+    Safe to share between chart threads; a request racing an identical one may compute twice.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self._cache = {}
+        self._lock = threading.Lock()
+        self.scans = 0
+        self.rollups = 0
+        self.hits = 0
+
+    def aggregate(self, keys, measure, agg='sum') -> pd.Series:
+        keys = (keys,) if isinstance(keys, str) else tuple(keys)
+        req = (keys, measure, agg)
+        with self._lock:
+            if req in self._cache:
+                self.hits += 1
+                return self._cache[req]
+            finer = self._finer(keys, measure) if agg == 'sum' else None
+            if finer is not None:
+                self.rollups += 1
+            else:
+                self.scans += 1
+        # computed outside the lock so other charts' groupbys can run meanwhile
+        if finer is not None:
+            result = finer.groupby(level=list(keys), dropna=False, observed=True).sum()
+        else:
+            result = self.df.groupby(list(keys), dropna=False, observed=True)[measure].agg(agg)
+        with self._lock:
+            self._cache[req] = result
+        return result
+
+    def prime(self, results: dict):
+        """Seed the memo with {(keys, measure, agg): series} computed elsewhere (e.g. by an engine)."""
+        with self._lock:
+            for (keys, measure, agg), result in results.items():
+                keys = (keys,) if isinstance(keys, str) else tuple(keys)
+                self._cache[(keys, measure, agg)] = result
+
+    def results(self) -> dict:
+        """Copy of the memo, {(keys, measure, agg): series}."""
+        with self._lock:
+            return dict(self._cache)
+
+    def _finer(self, keys, measure):
+        # smallest cached sum whose keys strictly contain the requested ones
+        best = None
+        for (ckeys, cmeasure, cagg), result in self._cache.items():
+            if cagg == 'sum' and cmeasure == measure and set(keys) < set(ckeys):
+                if best is None or len(result) < len(best):
+                    best = result
+        return best
+
+def aggregate(df: pd.DataFrame, keys, measure, agg='sum', planner: AggregationPlanner = None) -> pd.Series:
+    """Grouped aggregate of one measure, via the planner when it was built for this frame."""
+    if planner is not None and planner.df is df:
+        return planner.aggregate(keys, measure, agg)
+    keys = [keys] if isinstance(keys, str) else list(keys)
+    return df.groupby(keys, dropna=False, observed=True)[measure].agg(agg)
@@ -1,22 +1,28 @@
 
-import plotly.express as px
-import plotly.graph_objects as go
 import pandas as pd
+import numpy as np
 from utils import explain_lift, outcome_sentence
+from cube import LINE_COUNT
+from planner import aggregate
+from lazy import LazyModule
 
-def bar_by(df, value_col, group_col, title, note_context, top_n=15):
-    g = df.groupby(group_col, dropna=False)[value_col].sum().nlargest(top_n).reset_index()
+# plotly is imported on the first figure, not when plots is imported
+px = LazyModule('plotly.express')
+go = LazyModule('plotly.graph_objects')
+
+def bar_by(df, value_col, group_col, title, note_context, top_n=15, planner=None):
+    g = aggregate(df, group_col, value_col, planner=planner).nlargest(top_n).reset_index()
     fig = px.bar(g, x=group_col, y=value_col, title=title)
     fig.update_layout(xaxis_title=group_col.replace('_',' ').title(), yaxis_title=value_col.replace('_',' ').title())
-    note = explain_lift(df, group_col, value_col)
+    note = explain_lift(df, group_col, value_col, planner=planner)
     # Actionable idea template
     action = f"Allocate shelf space, promotions, and inventory toward top {group_col} while testing targeted offers to lift the long tail."
     return fig, outcome_sentence(note_context + ' ' + note, action)
 
-def stacked_bar_by(df, value_col, group_col, color_col, title, note_context, top_n=12):
-    g = df.groupby([group_col, color_col], dropna=False)[value_col].sum().reset_index()
+def stacked_bar_by(df, value_col, group_col, color_col, title, note_context, top_n=12, planner=None):
+    g = aggregate(df, [group_col, color_col], value_col, planner=planner).reset_index()
     # keep top_n groups
-    tops = g.groupby(group_col)[value_col].sum().nlargest(top_n).index
+    tops = aggregate(df, group_col, value_col, planner=planner).nlargest(top_n).index
     g = g[g[group_col].isin(tops)]
     fig = px.bar(g, x=group_col, y=value_col, color=color_col, title=title, barmode='stack')
     fig.update_layout(xaxis_title=group_col.replace('_',' ').title(), yaxis_title=value_col.replace('_',' ').title(), legend_title=color_col.replace('_',' ').title())
@@ -24,8 +30,8 @@ def stacked_bar_by(df, value_col, group_col, color_col, title, note_context, top
     action = f"Run segment-specific bundles/assortment tests to close gaps across {color_col} within top {group_col}."
     return fig, outcome_sentence(note_context + ' ' + note, action)
 
-def timeseries_monthly(df, date_col, value_col, title, note_context):
-    s = df.groupby('order_month')[value_col].sum().reset_index() if 'order_month' in df.columns else df.copy()
+def timeseries_monthly(df, date_col, value_col, title, note_context, planner=None):
+    s = aggregate(df, 'order_month', value_col, planner=planner).reset_index() if 'order_month' in df.columns else df.copy()
     if 'order_month' in s.columns:
         fig = px.line(s, x='order_month', y=value_col, markers=True, title=title)
         fig.update_layout(xaxis_title="Month", yaxis_title=value_col.replace('_',' ').title())
@@ -37,89 +43,143 @@ def timeseries_monthly(df, date_col, value_col, title, note_context):
         fig.update_layout(title=title)
         return fig, outcome_sentence("No month column found.", "Ensure datetime parsing is correct to enable seasonality planning.")
 
-def gender_age_breakdown(df, value_col, gender_col, age_group_col, title, note_context):
-    g = df.groupby([gender_col, age_group_col], dropna=False)[value_col].sum().reset_index()
+def gender_age_breakdown(df, value_col, gender_col, age_group_col, title, note_context, planner=None):
+    g = aggregate(df, [gender_col, age_group_col], value_col, planner=planner).reset_index()
     fig = px.bar(g, x=age_group_col, y=value_col, color=gender_col, barmode='group', title=title)
     fig.update_layout(xaxis_title="Age Group", yaxis_title=value_col.replace('_',' ').title(), legend_title=gender_col.replace('_',' ').title())
     note = "Certain age-gender cohorts contribute disproportionately."
     action = "Personalize offers by cohort (e.g., CRM segments and creatives for top age-gender groups)."
     return fig, outcome_sentence(note_context + ' ' + note, action)
 
-def scatter_price_qty(df, price_col, qty_col, title, note_context):
-    fig = px.scatter(df, x=price_col, y=qty_col, trendline='ols', title=title, opacity=0.5)
+def regression_stats(x, y) -> dict:
+    """Sufficient statistics of a least-squares line over finite (x, y) pairs; partial results
+    merge with merge_regression_stats, so the fit can come from chunks or cached aggregates."""
+    x = np.asarray(x, dtype=float); y = np.asarray(y, dtype=float)
+    keep = np.isfinite(x) & np.isfinite(y)
+    x, y = x[keep], y[keep]
+    return {'n': int(len(x)), 'sx': float(x.sum()), 'sy': float(y.sum()), 'sxy': float(x @ y), 'sxx': float(x @ x)}
+
+def merge_regression_stats(a: dict, b: dict) -> dict:
+    return {k: a[k] + b[k] for k in a}
+
+def fit_line(stats: dict):
+    """(slope, intercept) in closed form, or None when x has no spread."""
+    n, sx, sy = stats['n'], stats['sx'], stats['sy']
+    den = n * stats['sxx'] - sx * sx
+    if n < 2 or den <= 0:
+        return None
+    slope = (n * stats['sxy'] - sx * sy) / den
+    return slope, (sy - slope * sx) / n
+
+def scatter_price_qty(df, price_col, qty_col, title, note_context, max_points=20000, bins=60, stats=None):
+    """Price vs quantity without shipping every line: WebGL points up to max_points, otherwise a
+    server-side 2-D histogram. The trend line comes from regression_stats (pass `stats` to reuse
+    precomputed ones), so neither the fit nor the payload grows with the row count."""
+    x = pd.to_numeric(df[price_col], errors='coerce').to_numpy(dtype=float)
+    y = pd.to_numeric(df[qty_col], errors='coerce').to_numpy(dtype=float)
+    keep = np.isfinite(x) & np.isfinite(y)
+    x, y = x[keep], y[keep]
+    stats = stats or regression_stats(x, y)
+    fig = go.Figure()
+    if len(x) > max_points:
+        ybins = bins
+        if df[qty_col].dtype.kind in 'iu':
+            ybins = max(1, min(bins, int(y.max() - y.min()) + 1))  # one row per unit count
+        counts, xe, ye = np.histogram2d(x, y, bins=[bins, ybins])
+        z = np.where(counts.T > 0, counts.T, np.nan)
+        fig.add_heatmap(x=(xe[:-1] + xe[1:]) / 2, y=(ye[:-1] + ye[1:]) / 2, z=z, colorscale='Blues',
+                        colorbar=dict(title="Lines"), name="Lines")
+    else:
+        fig.add_trace(go.Scattergl(x=x, y=y, mode='markers', marker=dict(opacity=0.5), name="Lines"))
+    line = fit_line(stats)
+    if line is not None and len(x):
+        slope, intercept = line
+        xs = np.array([x.min(), x.max()])
+        fig.add_scatter(x=xs, y=intercept + slope * xs, mode='lines', name=f"OLS trend (slope {slope:.3g})")
+    fig.update_layout(title=title)
     fig.update_layout(xaxis_title=price_col.replace('_',' ').title(), yaxis_title=qty_col.replace('_',' ').title())
     note = "Negative slope suggests price sensitivity; strong positive suggests value packs/add-on buying."
     action = "Test price ladders and pack sizes; use markdowns surgically where elasticity is highest."
     return fig, outcome_sentence(note_context + ' ' + note, action)
 
-def aov_by(df, revenue_col, group_col, title, note_context):
-    g = df.groupby(group_col, dropna=False)[revenue_col].mean().reset_index().rename(columns={revenue_col:'AOV'})
+def aov_by(df, revenue_col, group_col, title, note_context, planner=None):
+    if LINE_COUNT in df.columns:
+        # cube cells: weight by line count instead of averaging cell totals
+        total = aggregate(df, group_col, revenue_col, planner=planner)
+        g = (total / aggregate(df, group_col, LINE_COUNT, planner=planner)).rename('AOV').reset_index()
+    else:
+        g = aggregate(df, group_col, revenue_col, 'mean', planner=planner).rename('AOV').reset_index()
     fig = px.bar(g, x=group_col, y='AOV', title=title)
     fig.update_layout(xaxis_title=group_col.replace('_',' ').title(), yaxis_title="Average Order Value (AED)")
     note = f"AOV differs meaningfully across {group_col}; prioritize high-AOV segments for premium/up-sell."
     action = "Adjust product recommendations and minimum basket thresholds by segment to lift AOV."
     return fig, outcome_sentence(note_context + ' ' + note, action)
 
-import plotly.express as px
-import pandas as pd
-from utils import explain_lift, outcome_sentence
-
-def bar_simple(df, value_col, group_col, title, note_context, top_n=15):
-    g = df.groupby(group_col, dropna=False)[value_col].sum().nlargest(top_n).reset_index()
+def bar_simple(df, value_col, group_col, title, note_context, top_n=15, planner=None):
+    g = aggregate(df, group_col, value_col, planner=planner).nlargest(top_n).reset_index()
     fig = px.bar(g, x=group_col, y=value_col, title=title)
     fig.update_layout(xaxis_title=group_col.replace('_',' ').title(), yaxis_title=value_col.replace('_',' ').title())
-    note = explain_lift(df, group_col, value_col)
+    note = explain_lift(df, group_col, value_col, planner=planner)
     action = f"Double down on top {group_col}; rationalize tail SKUs to free working capital."
     return fig, outcome_sentence(note_context + ' ' + note, action)
 
-def bar_dayofweek(df, value_col, title, note_context):
+def bar_dayofweek(df, value_col, title, note_context, planner=None):
     if 'day_of_week' not in df.columns:
         return None, outcome_sentence("No day_of_week column.", "Ensure datetime parsed correctly.")
     order_days = ["Monday","Tuesday","Wednesday","Thursday","Friday","Saturday","Sunday"]
-    g = df.groupby('day_of_week')[value_col].sum().reindex(order_days).reset_index()
+    g = aggregate(df, 'day_of_week', value_col, planner=planner).reindex(order_days).reset_index()
     fig = px.bar(g, x='day_of_week', y=value_col, title=title)
     fig.update_layout(xaxis_title="Day of Week", yaxis_title=value_col.replace('_',' ').title())
     action = "Run weekend-specific bundles and weekday traffic drivers to smooth demand."
     return fig, outcome_sentence(note_context, action)
 
-def bar_hourofday(df, value_col, title, note_context):
+def bar_hourofday(df, value_col, title, note_context, planner=None):
     if 'hour_of_day' not in df.columns:
         return None, outcome_sentence("No hour_of_day column.", "Ensure datetime parsed correctly.")
-    g = df.groupby('hour_of_day')[value_col].sum().reset_index()
+    g = aggregate(df, 'hour_of_day', value_col, planner=planner)
+    g = g[g.index.notna()].reset_index()
     fig = px.bar(g, x='hour_of_day', y=value_col, title=title)
     fig.update_layout(xaxis_title="Hour of Day", yaxis_title=value_col.replace('_',' ').title())
     action = "Align staff rostering and micro-promotions to peak hours."
     return fig, outcome_sentence(note_context, action)
 
-def donut_share(df, value_col, group_col, title, note_context, top_n=8):
-    g = df.groupby(group_col, dropna=False)[value_col].sum().nlargest(top_n).reset_index()
-    g.loc[len(g)] = ["Others", df.groupby(group_col, dropna=False)[value_col].sum() - g[value_col].sum()]
+def donut_share(df, value_col, group_col, title, note_context, top_n=8, planner=None):
+    totals = aggregate(df, group_col, value_col, planner=planner)
+    g = totals.nlargest(top_n).reset_index()
+    g[group_col] = g[group_col].astype(str)
+    # rounded so float noise from summing in a different order does not add an empty slice
+    rest = round(float(totals.sum() - g[value_col].sum()), 6)
+    if rest > 0:
+        g.loc[len(g)] = ["Others", rest]
     fig = px.pie(g, values=value_col, names=group_col, title=title, hole=0.5)
-    note = explain_lift(df, group_col, value_col)
+    note = explain_lift(df, group_col, value_col, planner=planner)
     action = "Protect share leaders; test challenger-brand promos to capture variety-seeking customers."
     return fig, outcome_sentence(note_context + ' ' + note, action)
 
-def qty_by_group(df, qty_col, group_col, title, note_context, top_n=15):
-    g = df.groupby(group_col, dropna=False)[qty_col].sum().nlargest(top_n).reset_index()
+def new_customer_share(monthly, title):
+    fig = px.line(monthly, x='order_month', y='new_customer_share', markers=True, title=title)
+    return fig, "Track the mix of new vs repeat customers; tailor acquisition vs loyalty spend accordingly."
+
+def qty_by_group(df, qty_col, group_col, title, note_context, top_n=15, planner=None):
+    g = aggregate(df, group_col, qty_col, planner=planner).nlargest(top_n).reset_index()
     fig = px.bar(g, x=group_col, y=qty_col, title=title)
     fig.update_layout(xaxis_title=group_col.replace('_',' ').title(), yaxis_title="Units Sold")
     action = "Use value packs and cross-sells for high-unit segments to lift basket size."
     return fig, outcome_sentence(note_context, action)
 
-def discount_vs_aov(df, discount_col, revenue_col, title, note_context):
+def discount_vs_aov(df, discount_col, revenue_col, title, note_context, planner=None):
     if discount_col not in df.columns:
         return None, outcome_sentence("No discount column.", "If available, analyze promo efficiency.")
-    g = df.groupby(discount_col)[revenue_col].mean().reset_index().rename(columns={revenue_col:'AOV'})
+    g = aggregate(df, discount_col, revenue_col, 'mean', planner=planner)
+    g = g[g.index.notna()].rename('AOV').reset_index()
     fig = px.line(g, x=discount_col, y='AOV', markers=True, title=title)
     fig.update_layout(xaxis_title=discount_col.replace('_',' ').title(), yaxis_title="Average Order Value (AED)")
     action = "Calibrate discount tiers to maximize AOV without eroding margin."
     return fig, outcome_sentence(note_context, action)
 
 
-import plotly.graph_objects as go
-
-def pareto_chart(df, value_col, group_col, title, note_context, top_n=25):
-    g = df.groupby(group_col, dropna=False)[value_col].sum().sort_values(ascending=False)
+def pareto_chart(df, value_col, group_col, title, note_context, top_n=25, planner=None):
+    g = aggregate(df, group_col, value_col, planner=planner).sort_values(ascending=False)
     g = g.head(top_n)
     cum = g.cumsum()/g.sum()*100
     fig = go.Figure()
@@ -135,18 +195,58 @@ def pareto_chart(df, value_col, group_col, title, note_context, top_n=25):
     action = "Apply 80/20 assortment and negotiate with top suppliers; long-tail test via online-only assortment."
     return fig, outcome_sentence(note_context + ' ' + note, action)
 
-def heatmap_pivot(df, value_col, row_col, col_col, title, note_context):
-    import plotly.express as px
-    piv = df.pivot_table(values=value_col, index=row_col, columns=col_col, aggfunc='sum', fill_value=0)
+def heatmap_pivot(df, value_col, row_col, col_col, title, note_context, planner=None):
+    piv = aggregate(df, [row_col, col_col], value_col, planner=planner).unstack(fill_value=0)
     fig = px.imshow(piv, aspect='auto', title=title)
     note = f"Heatmap shows strong pockets by {row_col} × {col_col}."
     action = "Replicate winning patterns and fix underperforming intersections (assortment, space, promos)."
     return fig, outcome_sentence(note_context + ' ' + note, action)
 
-def hist_distribution(series, title, xlab, note_context, bins=30):
-    import plotly.express as px
-    s = pd.Series(series).dropna()
-    fig = px.histogram(s, nbins=bins, title=title)
-    fig.update_layout(xaxis_title=xlab, yaxis_title="Count")
+def histogram_edges(values, bins=30, max_bins=200, weights=None) -> np.ndarray:
+    """Bin edges for `bins` equal-width bins, or Freedman-Diaconis widths with bins='fd'.
+    Integer data spanning no more bins than that gets one bin per value.
+    With weights, values are distinct totals and weights their counts (see streaming.py)."""
+    v = np.asarray(values, dtype=float)
+    keep = np.isfinite(v)
+    v = v[keep]
+    if len(v) == 0:
+        return np.array([0.0, 1.0])
+    lo, hi = float(v.min()), float(v.max())
+    if bins == 'fd':
+        if weights is None:
+            q1, q3 = np.percentile(v, [25, 75])
+            n_obs = len(v)
+        else:
+            w = np.asarray(weights, dtype=float)[keep]
+            order = np.argsort(v)
+            cum = np.cumsum(w[order])
+            n_obs = cum[-1]
+            q1, q3 = v[order][np.searchsorted(cum, [0.25 * n_obs, 0.75 * n_obs])]
+        width = 2 * (q3 - q1) / n_obs ** (1 / 3)
+        n = int(np.ceil((hi - lo) / width)) if width > 0 else 1
+    else:
+        n = int(bins)
+    n = max(1, min(n, max_bins))
+    if np.all(v == np.round(v)) and hi - lo + 1 <= n:
+        return np.arange(lo - 0.5, hi + 1.5)
+    return np.linspace(lo, hi, n + 1) if hi > lo else np.array([lo - 0.5, lo + 0.5])
+
+def histogram_counts(values, edges, weights=None) -> np.ndarray:
+    """Counts per bin. Counts over the same edges add, so partitions or cached aggregates merge by sum."""
+    v = np.asarray(values, dtype=float)
+    keep = np.isfinite(v)
+    w = None if weights is None else np.asarray(weights, dtype=float)[keep]
+    return np.histogram(v[keep], bins=edges, weights=w)[0]
+
+def hist_distribution(series, title, xlab, note_context, bins=30, edges=None, counts=None):
+    """Histogram binned on the server and drawn as a bar of counts, so the figure carries one
+    value per bin instead of every order. Pass edges and counts to render precomputed bins."""
+    if counts is None:
+        s = pd.Series(series).dropna()
+        edges = histogram_edges(s, bins) if edges is None else np.asarray(edges)
+        counts = histogram_counts(s, edges)
+    edges = np.asarray(edges, dtype=float)
+    fig = go.Figure(go.Bar(x=(edges[:-1] + edges[1:]) / 2, y=counts, width=np.diff(edges), name="Count"))
+    fig.update_layout(title=title, bargap=0, xaxis_title=xlab, yaxis_title="Count")
     action = "Use thresholds to target high-value orders and uplift low-value baskets via cross-sell nudges."
     return fig, outcome_sentence(note_context, action)
@@ -0,0 +1,317 @@
+import time
+import pandas as pd
+from pathlib import Path
+from utils import read_schema, infer_columns, infer_datetime_format, downcast_numeric, UTC_OFFSET
+from cube import LINE_COUNT, cube_columns, cube_measures
+from time_index import DateRange
+
+try:
+    import polars as pl
+except ImportError:  # optional backend; config.BACKEND falls back to pandas without it
+    pl = None
+
+# Polars version of the data path. Loading parses and engineers the CSV once; every rerun then
+# builds lazy queries over the filtered frame (cube, KPIs, per-order views, chart groupbys) and
+# collects them together with pl.collect_all, so the filter is planned once and the queries run
+# in parallel. Results are converted to small pandas frames for plots.py.
+
+AGE_BINS = [17, 24, 34, 44, 54, 64]
+AGE_LABELS = ['<18', '18-24', '25-34', '35-44', '45-54', '55-64', '65+']
+
+def standardize_columns(lf):
+    return lf.rename({c: c.strip() for c in lf.collect_schema().names()})
+
+def parse_datetimes(s):
+    """Same contract as utils.parse_datetimes: offsets dropped, strptime on the inferred format
+    (polars' own inference when none fits), dateutil only for the distinct strings left over."""
+    if s.head(500).drop_nulls().str.contains(UTC_OFFSET).any():
+        s = s.str.replace(UTC_OFFSET, '${1}')
+    values = s.drop_nulls()
+    fmt = infer_datetime_format(values.sample(min(500, len(values)), seed=0).to_pandas()) if len(values) else None
+    if fmt is not None:
+        # chrono reads '%f' as nanosecond digits; '%.f' is Python's '.%f'
+        out = s.str.strptime(pl.Datetime('us'), fmt.replace('.%f', '%.f'), strict=False)
+    else:
+        fmt = 'ISO8601'
+        out = s.str.to_datetime(time_unit='us', strict=False)
+        if out.dtype.time_zone is not None:
+            out = out.dt.replace_time_zone(None)
+    failed = out.is_null() & s.is_not_null()
+    stats = {'format': fmt, 'vectorized': int(out.is_not_null().sum()), 'fallback': int(failed.sum()), 'unparsed': 0}
+    if failed.any():
+        from dateutil import parser
+        def _parse(x):
+            try:
+                return parser.parse(x).replace(tzinfo=None)
+            except (ValueError, OverflowError):
+                return None
+        cache = {x: _parse(x) for x in s.filter(failed).unique().to_list()}
+        fixed = s.replace_strict(cache, default=None, return_dtype=pl.Datetime('us'))
+        out = out.zip_with(~failed, fixed)
+        stats['unparsed'] = int((out.is_null() & failed).sum())
+    return out, stats
+
+def engineer_features(frame, col_map: dict):
+    """utils.engineer_features on a polars DataFrame. Returns (LazyFrame, datetime parse stats)."""
+    odt = col_map.get('order_datetime')
+    stats = None
+    if odt is not None:
+        if frame.schema[odt] == pl.String:
+            parsed, stats = parse_datetimes(frame[odt])
+            frame = frame.with_columns(parsed)
+        else:
+            stats = {'format': None, 'vectorized': int(frame[odt].is_not_null().sum()), 'fallback': 0, 'unparsed': 0}
+    lf = frame.lazy()
+    if odt is not None:
+        ts = pl.col(odt)
+        lf = lf.with_columns(
+            ts.dt.date().alias('order_date'),
+            ts.dt.strftime('%Y-%m').alias('order_month'),
+            ts.dt.strftime('%A').alias('day_of_week'),
+            ts.dt.hour().cast(pl.Int32).alias('hour_of_day'),
+        )
+    names = lf.collect_schema().names()
+    rev = col_map.get('line_value')
+    if rev is None or rev not in names:
+        q, p, d = col_map.get('quantity'), col_map.get('unit_price'), col_map.get('discount')
+        if q and p:
+            value = pl.col(q).cast(pl.Float64) * pl.col(p).cast(pl.Float64)
+            if d and lf.collect_schema()[d].is_numeric():
+                value = value - pl.col(d).cast(pl.Float64)
+            lf = lf.with_columns(value.alias('line_value'))
+            col_map['line_value'] = 'line_value'
+    ag, a = col_map.get('age_group'), col_map.get('age')
+    if (ag is None or ag not in names) and a is not None:
+        age = pl.col(a).cast(pl.Float64)
+        # pd.cut(bins=[0, 17, ..., 64, 120], right=True, include_lowest=True); ages outside stay null
+        bucket = pl.when(~age.is_between(0, 120)).then(None)
+        for edge, label in zip(AGE_BINS, AGE_LABELS):
+            bucket = bucket.when(age <= edge).then(pl.lit(label))
+        lf = lf.with_columns(bucket.otherwise(pl.lit(AGE_LABELS[-1])).alias('age_group'))
+        col_map['age_group'] = 'age_group'
+    return lf, stats
+
+def load(path, metadata_path=None) -> dict:
+    """Read, standardize and engineer the CSV. Dimension columns stay strings in polars; their
+    pandas categories are recorded so results convert with the same dtypes as the pandas path."""
+    schema = read_schema(metadata_path) if metadata_path and Path(metadata_path).exists() else {}
+    header = pl.read_csv(path, n_rows=0).columns
+    overrides = {c: pl.String for c in header if schema.get(c.strip()) in ('category', 'string', 'datetime')}
+    lf = standardize_columns(pl.read_csv(path, schema_overrides=overrides, infer_schema_length=10000).lazy())
+    frame = lf.collect()
+    col_map = infer_columns(pd.DataFrame(columns=frame.columns))
+    lf, stats = engineer_features(frame, col_map)
+    frame = lf.collect()
+    odt = col_map.get('order_datetime')
+    if odt in frame.columns:
+        # time order, so a date range is a slice found by search_sorted (time_index.py)
+        frame = frame.sort(odt, nulls_last=True, maintain_order=True)
+    # engineer_features makes the customer id categorical too
+    categories = {c: pd.CategoricalDtype(sorted(frame[c].drop_nulls().unique().to_list()))
+                  for c in frame.columns if schema.get(c) == 'category' or c in ('day_of_week', col_map.get('customer_id'))}
+    if 'age_group' in frame.columns and schema.get('age_group') != 'category':
+        categories['age_group'] = pd.CategoricalDtype(AGE_LABELS, ordered=True)
+    # the dtypes utils.apply_schema gives these columns, for summed results (see _to_pandas)
+    numeric = {c: downcast_numeric(frame[c].to_pandas(), schema[c]).dtype
+               for c in frame.columns if schema.get(c) in ('flag', 'int', 'float') and frame.schema[c].is_numeric()}
+    customers = _customer_query(frame.lazy(), col_map)
+    return {'frame': frame, 'col_map': col_map, 'columns': frame.columns, 'categories': categories, 'numeric': numeric,
+            'datetime_parse': stats, 'customers': None if customers is None else customers.collect()}
+
+def distinct_labels(db: dict, col: str) -> list:
+    return sorted(db['frame'][col].drop_nulls().cast(pl.String).unique().to_list())
+
+def filtered(db: dict, selections: dict):
+    frame = db['frame']
+    for col, rng in selections.items():
+        if isinstance(rng, DateRange):
+            lo, hi = (frame[col].search_sorted(t.to_pydatetime()) for t in rng)
+            frame = frame.slice(lo, hi - lo)
+    lf = frame.lazy()
+    for col, labels in selections.items():
+        if labels and not isinstance(labels, DateRange):
+            lf = lf.filter(pl.col(col).cast(pl.String).is_in(labels))
+    return lf
+
+def _to_pandas(db: dict, frame, sums: dict = None) -> pd.DataFrame:
+    """pandas frame with the pandas path's dtypes: recorded categories, and for each column in
+    `sums` (result column -> summed source column) the source dtype a pandas groupby sum keeps."""
+    out = frame.to_pandas()
+    for col, dtype in db['categories'].items():
+        if col in out.columns:
+            out[col] = pd.Categorical(out[col], dtype=dtype)
+    for col, src in (sums or {}).items():
+        dtype = db['numeric'].get(src)
+        if col in out.columns and dtype is not None and (dtype.kind == 'f' or out[col].notna().all()):
+            out[col] = out[col].astype(dtype)
+    return out
+
+def _per_order_sums(col_map: dict) -> dict:
+    return {'order_revenue': col_map.get('line_value'), 'order_units': col_map.get('quantity')}
+
+def _cube_query(db: dict, lf, col_map: dict):
+    probe = pd.DataFrame(columns=db['columns'])
+    dims = cube_columns(probe, col_map)
+    measures = [m for m in cube_measures(col_map) if m in db['columns']]
+    return dims, lf.group_by(dims, maintain_order=True).agg(
+        [pl.col(m).sum() for m in measures] + [pl.len().cast(pl.Int64).alias(LINE_COUNT)])
+
+def _kpi_query(lf, col_map: dict):
+    rev, qty, cust = col_map.get('line_value'), col_map.get('quantity'), col_map.get('customer_id')
+    exprs = []
+    if rev:
+        exprs += [pl.col(rev).sum().alias('Total Revenue (AED)'), pl.col(rev).mean().alias('Avg Order Value (AED)')]
+    if qty:
+        exprs += [pl.col(qty).sum().alias('Total Units Sold'), pl.col(qty).mean().alias('Avg Units per Order')]
+    if cust:
+        exprs.append(pl.col(cust).drop_nulls().n_unique().alias('Unique Customers'))
+    return lf.select(exprs) if exprs else None
+
+def _customer_query(lf, col_map: dict):
+    """Customer dimension (see customers.py): first month and distinct orders per customer id."""
+    cust = col_map.get('customer_id')
+    columns = lf.collect_schema().names()
+    if not cust or cust not in columns or 'order_month' not in columns:
+        return None
+    oid = col_map.get('order_id') or ('order_id' if 'order_id' in columns else None)
+    orders = pl.col(oid).n_unique() if oid else pl.len()
+    return lf.filter(pl.col(cust).is_not_null()).group_by(cust).agg(
+        pl.col('order_month').min().alias('first_month'), orders.cast(pl.Int64).alias('orders'))
+
+def _repeat_query(lf, col_map: dict, customers=None):
+    cust = col_map.get('customer_id')
+    if not cust:
+        return None
+    if customers is not None:
+        # lifetime order counts of the filtered customers, from the dimension
+        seen = lf.select(pl.col(cust).drop_nulls().unique()).join(customers.lazy(), on=cust)
+        return seen.select((pl.col('orders') > 1).mean().alias('Repeat Customer Rate'))
+    counts = lf.filter(pl.col(cust).is_not_null()).group_by(cust).agg(pl.len().alias('n'))
+    return counts.select((pl.col('n') > 1).mean().alias('Repeat Customer Rate'))
+
+def _per_order_query(db: dict, lf, col_map: dict):
+    columns = db['columns']
+    oid = col_map.get('order_id') or ('order_id' if 'order_id' in columns else None)
+    rev, qty, cust = col_map.get('line_value'), col_map.get('quantity'), col_map.get('customer_id')
+    if oid is None or rev is None:
+        return None, []
+    gcols = [oid] + (['order_month'] if 'order_month' in columns else []) + ([cust] if cust else [])
+    aggs = [pl.col(rev).sum().alias('order_revenue')]
+    if qty:
+        aggs.append(pl.col(qty).sum().cast(pl.Int64).alias('order_units'))
+    # pandas groupby drops rows with a null key
+    per = lf.drop_nulls(gcols).group_by(gcols).agg(aggs).sort(gcols)
+    return per, gcols
+
+def _new_vs_repeat_query(per, gcols, col_map: dict, customers=None):
+    cust = col_map.get('customer_id')
+    if per is None or cust is None or 'order_month' not in gcols:
+        return None, None
+    if customers is not None:
+        flagged = per.join(customers.lazy().select(cust, 'first_month'), on=cust, how='left').sort(gcols)
+    else:
+        flagged = per.with_columns(pl.col('order_month').min().over(cust).alias('first_month'))
+    flagged = flagged.with_columns(
+        (pl.col('order_month') == pl.col('first_month')).cast(pl.Int64).alias('is_new'))
+    summary = flagged.group_by('order_month').agg(
+        pl.col('is_new').mean().alias('new_customer_share'), pl.len().cast(pl.Int64).alias('orders')).sort('order_month')
+    return flagged, summary
+
+def run(db: dict, col_map: dict, selections: dict, chart_keys=(), daypart_cols=('day_of_week', 'hour_of_day')) -> dict:
+    """All per-rerun results in one pl.collect_all over the filtered frame.
+
+    chart_keys lists the groupings the charts will ask the planner for; each comes back as
+    {(keys, measure, 'sum'): pd.Series} for revenue and LINE_COUNT, ready for AggregationPlanner.prime.
+    """
+    lf = filtered(db, selections)
+    rev = col_map.get('line_value')
+    queries = {}
+    dims, queries['cube'] = _cube_query(db, lf, col_map)
+    if rev and set(daypart_cols) <= set(db['columns']):
+        queries['daypart'] = lf.group_by(list(daypart_cols)).agg(pl.col(rev).sum())
+    queries['kpis'] = _kpi_query(lf, col_map)
+    queries['repeat'] = _repeat_query(lf, col_map, db.get('customers'))
+    per, gcols = _per_order_query(db, lf, col_map)
+    queries['per'] = per
+    queries['nvr'], queries['nvr_summary'] = _new_vs_repeat_query(per, gcols, col_map, db.get('customers'))
+    chart_keys = [tuple(k) for k in chart_keys if all(c in dims for c in k)] if rev else []
+    for i, keys in enumerate(chart_keys):
+        queries[('chart', i)] = lf.group_by(list(keys)).agg(pl.col(rev).sum(), pl.len().cast(pl.Int64).alias(LINE_COUNT))
+    names = [n for n, query in queries.items() if query is not None]
+    frames = dict(zip(names, pl.collect_all([queries[n] for n in names])))
+
+    out = {'cube': _to_pandas(db, frames['cube'])}
+    for col in dims:
+        if not isinstance(out['cube'][col].dtype, pd.CategoricalDtype):
+            out['cube'][col] = out['cube'][col].astype('category')
+    out['daypart'] = _to_pandas(db, frames['daypart'], sums={rev: rev}) if 'daypart' in frames else None
+    k = {}
+    if 'kpis' in frames:
+        k = {name: (float('nan') if v is None else v) for name, v in frames['kpis'].row(0, named=True).items()}
+        for name in ('Total Revenue (AED)', 'Total Units Sold'):
+            if name in k:
+                k[name] = float(k[name] or 0)
+        if 'Unique Customers' in k:
+            k['Unique Customers'] = int(k['Unique Customers'])
+    if 'repeat' in frames:
+        rc = frames['repeat'].item()
+        k['Repeat Customer Rate'] = float('nan') if rc is None else float(rc)
+    out['kpis'] = k
+    sums = _per_order_sums(col_map)
+    out['per'] = _to_pandas(db, frames['per'], sums) if 'per' in frames else None
+    out['nvr'] = (_to_pandas(db, frames['nvr'], sums), frames['nvr_summary'].to_pandas()) if 'nvr' in frames else None
+    aggregates = {}
+    for i, keys in enumerate(chart_keys):
+        g = _to_pandas(db, frames[('chart', i)], sums={rev: rev})
+        for col in keys:
+            # cube dimensions are categoricals, so the planner's groupbys index by category
+            g[col] = g[col].astype(out['cube'][col].dtype)
+        g = g.set_index(list(keys)).sort_index()
+        for measure in (rev, LINE_COUNT):
+            aggregates[(keys, measure, 'sum')] = g[measure]
+    out['aggregates'] = aggregates
+    return out
+
+if __name__ == "__main__":
+    import argparse
+    from utils import load_typed_csv, standardize_columns as pd_standardize, engineer_features as pd_engineer
+    from utils import kpis, per_order_metrics, new_vs_repeat_by_month
+    from cube import build_cube
+    from customers import build_customers
+    base = Path(__file__).parent / "data"
+    ap = argparse.ArgumentParser(description="Time the pandas and polars data paths on the same CSV.")
+    ap.add_argument("--csv", default=str(base / "lulu_uae_master_2000.csv"))
+    ap.add_argument("--metadata", default=str(base / "lulu_uae_master_metadata.csv"))
+    ap.add_argument("--filter", default="city=Dubai", help="column=label applied to the rerun step")
+    ap.add_argument("--runs", type=int, default=5)
+    args = ap.parse_args()
+    col, label = args.filter.split("=", 1)
+
+    def best(fn):
+        times = []
+        for _ in range(args.runs):
+            t = time.perf_counter()
+            result = fn()
+            times.append(time.perf_counter() - t)
+        return min(times), result
+
+    def pandas_load():
+        df = pd_standardize(load_typed_csv(args.csv, args.metadata))
+        cmap = infer_columns(df)
+        df = pd_engineer(df, cmap)
+        return df, cmap, build_customers(df, cmap)
+
+    def pandas_rerun():
+        rows = df[df[col].astype(str) == label]
+        cube = build_cube(rows, cmap)
+        per = per_order_metrics(rows, cmap)
+        return kpis(cube, cmap, rows=rows, customers=dim), per, new_vs_repeat_by_month(rows, cmap, dim, per=per)
+
+    load_pd, (df, cmap, dim) = best(pandas_load)
+    rerun_pd, _ = best(pandas_rerun)
+    load_pl, db = best(lambda: load(args.csv, args.metadata))
+    rerun_pl, _ = best(lambda: run(db, db['col_map'], {col: [label]}))
+    print(f"rows: {len(df):,}  filter: {args.filter}  best of {args.runs}")
+    print(f"{'step':<8}{'pandas':>12}{'polars':>12}")
+    print(f"{'load':<8}{load_pd * 1000:>10.1f}ms{load_pl * 1000:>10.1f}ms")
+    print(f"{'rerun':<8}{rerun_pd * 1000:>10.1f}ms{rerun_pl * 1000:>10.1f}ms")
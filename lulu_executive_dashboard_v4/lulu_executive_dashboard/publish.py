@@ -0,0 +1,190 @@
+import json
+import os
+import shutil
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+from snapshot import file_digest
+from filter_index import build_filter_index
+from cube import build_cube, build_cell_sketches, cube_columns
+from customers import build_customers
+from dataset import load_frame, filter_columns
+
+# Engineered dataset published once per host and memory-mapped by every dashboard replica:
+#   CURRENT                  - name of the live version, swapped with an atomic rename
+#   <version>/frame.arrow    - engineered rows, uncompressed Arrow IPC
+#   <version>/cube.arrow, customers.arrow
+#   <version>/<index>.npy    - filter index bitmaps, one packed row per (column, label)
+#   <version>/meta.json      - col_map, frame attrs, index labels
+# A version is written under a temporary name and renamed into place before CURRENT points at it,
+# so replicas never open a half-written one. Replicas map the files read-only, and the page cache
+# keeps one physical copy for all of them.
+#   python publish.py [--force]
+
+PUBLISH_VERSION = 2
+CURRENT = "CURRENT"
+STALE_TMP_SECONDS = 3600
+# Dictionary columns with more labels than this (customer ids) keep Arrow-backed categories
+# instead of one Python string per label.
+BIG_DICTIONARY = 10_000
+
+def _types(ty):
+    # strings and dates stay Arrow-backed, so they are views of the mapped file like the numbers
+    if pa.types.is_string(ty) or pa.types.is_large_string(ty):
+        return pd.StringDtype("pyarrow")
+    if pa.types.is_date(ty):
+        return pd.ArrowDtype(ty)
+    return None
+
+def _fsync(path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def _write_arrow(path, df: pd.DataFrame, preserve_index=False):
+    table = pa.Table.from_pandas(df, preserve_index=preserve_index)
+    with pa.OSFile(str(path), "wb") as sink, ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    _fsync(path)
+
+def _read_arrow(path) -> pd.DataFrame:
+    table = ipc.open_file(pa.memory_map(str(path), "r")).read_all()
+    big = {}
+    for i, field in enumerate(table.schema):
+        col = table.column(i)
+        if (pa.types.is_dictionary(field.type) and pa.types.is_string(field.type.value_type)
+                and col.num_chunks == 1 and col.null_count == 0 and len(col.chunk(0).dictionary) > BIG_DICTIONARY):
+            big[i] = col.chunk(0)
+    # split_blocks keeps one block per column, so null-free numeric columns are not copied
+    df = table.drop_columns([table.schema[i].name for i in big]).to_pandas(split_blocks=True, types_mapper=_types)
+    for i, arr in big.items():
+        categories = pd.Index(pd.arrays.ArrowStringArray(pa.chunked_array([arr.dictionary])))
+        codes = arr.indices.to_numpy(zero_copy_only=True)
+        df.insert(i, table.schema[i].name, pd.Categorical.from_codes(codes, dtype=pd.CategoricalDtype(categories), validate=False))
+    return df
+
+def _write_index(directory: Path, name: str, index: dict) -> dict:
+    labels, rows = [], []
+    for col, bitmaps in index['columns'].items():
+        for label, bits in bitmaps.items():
+            labels.append([col, label])
+            rows.append(bits)
+    width = (index['n_rows'] + 7) // 8
+    np.save(directory / f"{name}.npy", np.vstack(rows) if rows else np.zeros((0, width), dtype=np.uint8))
+    _fsync(directory / f"{name}.npy")
+    return {'n_rows': index['n_rows'], 'labels': labels}
+
+def _read_index(directory: Path, name: str, meta: dict) -> dict:
+    bits = np.load(directory / f"{name}.npy", mmap_mode="r")
+    index = {'n_rows': meta['n_rows'], 'columns': {}}
+    for i, (col, label) in enumerate(meta['labels']):
+        index['columns'].setdefault(col, {})[label] = bits[i]
+    return index
+
+def current(root) -> str:
+    """Live version name, or None before the first publish."""
+    path = Path(root) / CURRENT
+    return path.read_text().strip() if path.exists() else None
+
+def publish(src, metadata_path, root, snapshot_dir, sketch_precision=None, keep=2, force=False) -> str:
+    """Build and publish the dataset for src unless the live version already matches it; returns
+    the live version. Older versions beyond `keep` are removed (open mappings of them stay valid)."""
+    root = Path(root)
+    root.mkdir(parents=True, exist_ok=True)
+    digest = file_digest(src)[:16]
+    live = current(root)
+    if live and not force:
+        meta = json.loads((root / live / "meta.json").read_text())
+        if meta.get('version') == PUBLISH_VERSION and meta.get('digest') == digest and meta.get('sketch_precision') == sketch_precision:
+            return live
+
+    df, col_map = load_frame(src, metadata_path, snapshot_dir)
+    tmp = root / f".tmp-{uuid.uuid4().hex}"
+    tmp.mkdir()
+    try:
+        _write_arrow(tmp / "frame.arrow", df)
+        meta = {'version': PUBLISH_VERSION, 'source': Path(src).name, 'digest': digest, 'col_map': col_map,
+                'attrs': df.attrs, 'rows': len(df), 'sketch_precision': sketch_precision,
+                'created': datetime.now(timezone.utc).isoformat(timespec='seconds'), 'indexes': {}}
+        meta['indexes']['filter_index'] = _write_index(tmp, 'filter_index', build_filter_index(df, filter_columns(df, col_map)))
+        cube = build_cube(df, col_map)
+        if cube is not None:
+            _write_arrow(tmp / "cube.arrow", cube)
+            meta['indexes']['cube_index'] = _write_index(tmp, 'cube_index', build_filter_index(cube, cube_columns(cube, col_map)))
+            if sketch_precision:
+                np.save(tmp / "sketches.npy", build_cell_sketches(df, col_map, len(cube), sketch_precision))
+        customers = build_customers(df, col_map)
+        if customers is not None:
+            # rows follow the id column's categories, which become the index again on open
+            aligned = isinstance(df[col_map['customer_id']].dtype, pd.CategoricalDtype)
+            meta['customers_aligned'] = aligned
+            _write_arrow(tmp / "customers.arrow", customers, preserve_index=not aligned)
+        (tmp / "meta.json").write_text(json.dumps(meta, indent=1, default=str))
+        _fsync(tmp / "meta.json")
+        version = f"{digest}-{time.time_ns()}"
+        tmp.rename(root / version)
+        pointer = root / f"{CURRENT}.{uuid.uuid4().hex}"
+        pointer.write_text(version)
+        _fsync(pointer)
+        os.replace(pointer, root / CURRENT)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    _prune(root, version, keep)
+    return version
+
+def _prune(root: Path, live: str, keep: int):
+    versions = sorted((p for p in root.iterdir() if p.is_dir() and not p.name.startswith(".") and p.name != live),
+                      key=lambda p: p.stat().st_mtime, reverse=True)
+    for old in versions[max(keep - 1, 0):]:
+        shutil.rmtree(old, ignore_errors=True)
+    # temporary directories left behind by an interrupted publish
+    for tmp in root.glob(".tmp-*"):
+        if time.time() - tmp.stat().st_mtime > STALE_TMP_SECONDS:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+def open_version(root, version: str = None) -> dict:
+    """Memory-map a published version (the live one by default)."""
+    version = version or current(root)
+    if version is None:
+        raise FileNotFoundError(f"Nothing published in {root}; run `python publish.py` first.")
+    directory = Path(root) / version
+    meta = json.loads((directory / "meta.json").read_text())
+    frame = _read_arrow(directory / "frame.arrow")
+    frame.attrs.update(meta.get('attrs', {}))
+    out = {'version': version, 'frame': frame, 'col_map': meta['col_map'],
+           'filter_index': _read_index(directory, 'filter_index', meta['indexes']['filter_index']),
+           'cube': None, 'cube_index': None, 'sketches': None, 'customers': None}
+    if (directory / "cube.arrow").exists():
+        out['cube'] = _read_arrow(directory / "cube.arrow")
+        out['cube_index'] = _read_index(directory, 'cube_index', meta['indexes']['cube_index'])
+    if (directory / "sketches.npy").exists():
+        out['sketches'] = np.load(directory / "sketches.npy", mmap_mode="r")
+    if (directory / "customers.arrow").exists():
+        out['customers'] = _read_arrow(directory / "customers.arrow")
+        if meta.get('customers_aligned'):
+            out['customers'].index = frame[meta['col_map']['customer_id']].cat.categories
+    return out
+
+if __name__ == "__main__":
+    import argparse
+    from config import PUBLISH_DIR, SKETCH_MODE, HLL_PRECISION
+    base = Path(__file__).parent / "data"
+    ap = argparse.ArgumentParser(description="Publish the engineered dataset for memory-mapped replicas.")
+    ap.add_argument("--csv", default=str(base / "lulu_uae_master_2000.csv"))
+    ap.add_argument("--metadata", default=str(base / "lulu_uae_master_metadata.csv"))
+    ap.add_argument("--root", default=PUBLISH_DIR)
+    ap.add_argument("--keep", type=int, default=2, help="versions kept on disk, including the live one")
+    ap.add_argument("--force", action="store_true", help="publish even if the live version matches the CSV")
+    args = ap.parse_args()
+    t = time.perf_counter()
+    version = publish(args.csv, args.metadata, args.root, base / ".cache",
+                      HLL_PRECISION if SKETCH_MODE else None, args.keep, args.force)
+    print(f"live version {version} ({time.perf_counter() - t:.2f}s)")
@@ -0,0 +1,167 @@
+import html
+import importlib
+import importlib.util
+import json
+import multiprocessing
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+import pandas as pd
+from utils import kpis, safe_num, per_order_metrics, new_vs_repeat_by_month
+from charts import chart_specs
+from planner import AggregationPlanner
+from filter_index import FILTERS
+from warmup import DEFERRED
+from dataset import load_dataset, select, filter_columns
+from time_index import WINDOWS, date_bounds, window
+
+# Headless weekly pack: the dashboard rendered once per filter preset, without Streamlit.
+#   python report.py                                  one preset per city, department and store format
+#   python report.py --by city channel --formats html png
+#   python report.py --presets presets.json           [{"name": "Dubai online", "filters": {"city": ["Dubai"], "channel": ["Online"]}}]
+#   python report.py --window "Last 7 days"           date window for presets without their own "window" (or "start"/"end")
+# Presets run on a process pool. The dataset is loaded once in the parent and inherited by forked
+# workers (where fork is unavailable each worker loads it; LULU_INGEST_MODE=published maps the
+# same files). Each preset becomes <out>/<name>.html with its KPIs, charts and outcome notes;
+# PNG/PDF write one file per chart under <out>/<name>/ and need kaleido.
+
+BASE_DIR = Path(__file__).parent
+REPORT_DIR = BASE_DIR / "reports"
+DEFAULT_BY = ['city', 'department', 'store_format']
+DAYPART_COLS = ['day_of_week', 'hour_of_day']
+
+pd.set_option("mode.copy_on_write", True)
+
+# set in the parent before the pool starts, so forked workers share its pages
+_DATA = None
+
+def _init_worker():
+    global _DATA
+    if _DATA is None:
+        _DATA = load_dataset()
+
+def slug(name: str) -> str:
+    return re.sub(r'[^A-Za-z0-9]+', '-', name).strip('-').lower() or 'all'
+
+def presets_by(data: dict, keys) -> list:
+    """The unfiltered dashboard, then one preset per label of each filter key."""
+    cols = dict(zip([key for key, _ in FILTERS], filter_columns(data['frame'], data['col_map'])))
+    presets = [{'name': 'All', 'filters': {}}]
+    for key in keys:
+        if not cols.get(key):
+            raise ValueError(f"No '{key}' column to split by.")
+        for label in sorted(data['filter_index']['columns'][cols[key]]):
+            presets.append({'name': f"{key.replace('_', ' ').title()} - {label}", 'filters': {key: [label]}})
+    return presets
+
+def _note_html(note: str) -> str:
+    return re.sub(r'\*\*(.+?)\*\*', r'<strong>\1</strong>', html.escape(note))
+
+def _page(name: str, k: dict, figures: list) -> str:
+    tiles = "".join(f"<div class='kpi'><span>{html.escape(n)}</span><b>{f'{v:.1%}' if n == 'Repeat Customer Rate' else safe_num(v)}</b></div>"
+                    for n, v in k.items())
+    body = "".join(f"{fig.to_html(full_html=False, include_plotlyjs=False)}<div class='outcome-card'>📌 {_note_html(note)}</div>"
+                   for _, fig, note in figures)
+    return f"""<!DOCTYPE html><html><head><meta charset="utf-8"><title>Lulu Executive Dashboard - {html.escape(name)}</title>
+<script src="plotly.min.js"></script><style>
+body {{ font-family: sans-serif; margin: 2rem; }} .kpis {{ display: flex; gap: 2rem; flex-wrap: wrap; }}
+.kpi span {{ display: block; color: #6b7280; font-size: .85rem; }} .kpi b {{ font-size: 1.6rem; }}
+.outcome-card {{ background: #f8fafc; border-left: 6px solid #0ea5e9; padding: 12px 14px; margin: 4px 0 24px; color: #0f172a; }}
+</style></head><body><h1>🛒 Lulu Executive Dashboard</h1><h2>{html.escape(name)}</h2>
+<div class="kpis">{tiles}</div><hr>{body}</body></html>"""
+
+def render_preset(preset: dict, out_dir, formats) -> dict:
+    """Build every chart for one preset and write its bundle; returns the files and timings."""
+    t = time.perf_counter()
+    data, col_map = _DATA, _DATA['col_map']
+    cols = dict(zip([key for key, _ in FILTERS], filter_columns(data['frame'], col_map)))
+    selections = {cols[key]: labels for key, labels in preset['filters'].items()}
+    odt = col_map.get('order_datetime')
+    if preset.get('window') or preset.get('start'):
+        first, last = date_bounds(data['frame'], odt)
+        rng = window(preset.get('window') or "Custom", last, preset.get('start') or first, preset.get('end') or last)
+        if rng is not None:
+            selections[odt] = rng
+    filtered, agg_view = select(data, selections)
+    daypart = filtered if set(DAYPART_COLS) <= set(filtered.columns) else None
+    k = kpis(agg_view, col_map, rows=filtered, customers=data['customers'])
+    per = per_order_metrics(filtered, col_map)
+    nvr = new_vs_repeat_by_month(filtered, col_map, data['customers'], per=per)
+    planner = AggregationPlanner(agg_view)
+    figures = []
+    for chart_id, fn, args, kwargs in chart_specs(col_map, agg_view, daypart, per, nvr, planner):
+        fig, note = fn(*args, **kwargs)
+        if fig is not None:
+            figures.append((chart_id, fig, note))
+    built = time.perf_counter() - t
+
+    out_dir, name, files = Path(out_dir), slug(preset['name']), []
+    if 'html' in formats:
+        (out_dir / f"{name}.html").write_text(_page(preset['name'], k, figures), encoding='utf-8')
+        files.append(f"{name}.html")
+    images = [f for f in formats if f != 'html']
+    if images:
+        (out_dir / name).mkdir(exist_ok=True)
+        for i, (chart_id, fig, _) in enumerate(figures):
+            for fmt in images:
+                fig.write_image(out_dir / name / f"{i:02d}-{chart_id}.{fmt}", format=fmt, width=1200, height=600)
+                files.append(f"{name}/{i:02d}-{chart_id}.{fmt}")
+    return {'name': preset['name'], 'files': files, 'charts': len(figures), 'rows': len(filtered),
+            'build_s': built, 'total_s': time.perf_counter() - t, 'pid': os.getpid()}
+
+def render_all(presets: list, out_dir=REPORT_DIR, formats=('html',), workers: int = None, log=print) -> list:
+    if any(f != 'html' for f in formats) and importlib.util.find_spec('kaleido') is None:
+        raise RuntimeError("PNG/PDF export needs kaleido (pip install kaleido); use --formats html without it.")
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    if 'html' in formats:
+        from plotly.offline import get_plotlyjs
+        # one copy of plotly.js next to the pages instead of 3+ MB embedded in each
+        (out_dir / "plotly.min.js").write_text(get_plotlyjs(), encoding='utf-8')
+    _init_worker()
+    cols = dict(zip([key for key, _ in FILTERS], filter_columns(_DATA['frame'], _DATA['col_map'])))
+    for p in presets:
+        unknown = [key for key in p['filters'] if not cols.get(key)]
+        if unknown:
+            raise ValueError(f"Preset '{p['name']}' filters on {unknown}; use {sorted(k for k, c in cols.items() if c)}.")
+    for m in DEFERRED:
+        importlib.import_module(m)
+    workers = max(1, min(workers or os.cpu_count() or 1, len(presets)))
+    methods = multiprocessing.get_all_start_methods()
+    ctx = multiprocessing.get_context('fork' if 'fork' in methods else None)
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_init_worker) as pool:
+        futures = [pool.submit(render_preset, p, out_dir, tuple(formats)) for p in presets]
+        for future in as_completed(futures):
+            r = future.result()
+            log(f"{r['name']:<40}{r['rows']:>9,} rows {r['charts']:>3} charts {r['total_s']:>7.2f}s")
+            results.append(r)
+    order = {p['name']: i for i, p in enumerate(presets)}
+    results.sort(key=lambda r: order[r['name']])
+    if 'html' in formats:
+        links = "".join(f"<li><a href='{html.escape(r['files'][0])}'>{html.escape(r['name'])}</a></li>" for r in results)
+        (out_dir / "index.html").write_text(f"<!DOCTYPE html><html><head><meta charset='utf-8'><title>Weekly pack</title></head>"
+                                            f"<body><h1>Weekly pack</h1><ul>{links}</ul></body></html>", encoding='utf-8')
+    return results
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="Render the dashboard for a list of filter presets without Streamlit.")
+    ap.add_argument("--presets", help="JSON file: [{\"name\": ..., \"filters\": {\"city\": [\"Dubai\"]}}, ...]")
+    ap.add_argument("--by", nargs="+", default=DEFAULT_BY, choices=[key for key, _ in FILTERS],
+                    help="one preset per label of these filters (ignored with --presets)")
+    ap.add_argument("--window", choices=WINDOWS[:-1], help="date window for presets that do not set one")
+    ap.add_argument("--formats", nargs="+", default=["html"], choices=["html", "png", "pdf"])
+    ap.add_argument("--out", default=str(REPORT_DIR))
+    ap.add_argument("--workers", type=int, default=None, help="processes (default: CPU count)")
+    args = ap.parse_args()
+    t = time.perf_counter()
+    _init_worker()
+    print(f"dataset loaded in {time.perf_counter() - t:.2f}s")
+    presets = json.loads(Path(args.presets).read_text()) if args.presets else presets_by(_DATA, args.by)
+    if args.window:
+        presets = [p if p.get('window') or p.get('start') else {**p, 'window': args.window} for p in presets]
+    results = render_all(presets, args.out, args.formats, args.workers)
+    print(f"{len(results)} presets, {sum(r['charts'] for r in results)} charts in {time.perf_counter() - t:.2f}s -> {args.out}")
@@ -0,0 +1,64 @@
+import hashlib
+import json
+from pathlib import Path
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # snapshots are an optimization; fall back to plain CSV loads
+    pa = None
+    pq = None
+
+SNAPSHOT_VERSION = 4
+META_KEY = b"lulu_snapshot"
+
+def file_digest(path, chunk_size=1 << 20) -> str:
+    """Content hash of the source file (sha256, streamed so large exports stay out of memory)."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def snapshot_path(source, cache_dir) -> Path:
+    source = Path(source)
+    return Path(cache_dir) / f"{source.stem}-{file_digest(source)[:16]}.parquet"
+
+def read_snapshot(path):
+    """Return (df, col_map) from a snapshot file, or None if it is missing or unreadable."""
+    path = Path(path)
+    if pq is None or not path.exists():
+        return None
+    try:
+        table = pq.read_table(path, memory_map=True)
+        meta = json.loads(table.schema.metadata[META_KEY])
+        if meta.get("version") != SNAPSHOT_VERSION:
+            return None
+        df = table.to_pandas()
+    except Exception:
+        return None
+    df.attrs.update(meta.get("attrs", {}))
+    return df, meta["col_map"]
+
+def write_snapshot(path, df: pd.DataFrame, col_map: dict) -> bool:
+    """Persist the engineered frame and its col_map; stale snapshots of the same source are removed."""
+    if pq is None:
+        return False
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    meta = {"version": SNAPSHOT_VERSION, "col_map": col_map, "attrs": df.attrs}
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), META_KEY: json.dumps(meta, default=str)})
+    tmp = path.with_suffix(".tmp")
+    try:
+        pq.write_table(table, tmp)
+        tmp.replace(path)
+    except Exception:
+        tmp.unlink(missing_ok=True)
+        return False
+    source_stem = path.stem.rsplit("-", 1)[0]
+    for old in path.parent.glob(f"{source_stem}-*.parquet"):
+        if old != path and old.stem.rsplit("-", 1)[0] == source_stem:
+            old.unlink(missing_ok=True)
+    return True
@@ -0,0 +1,138 @@
+import pandas as pd
+from utils import load_typed_csv, standardize_columns, infer_columns, engineer_features, per_order_metrics
+from cube import build_cube, merge_cubes, build_cell_sketches, merge_cell_sketches
+from plots import histogram_edges, histogram_counts
+
+# Partial state kept per chunk. Every field merges without the rows it came from, so peak
+# memory follows the chunk size (plus the cube and per-customer counts), not the file size.
+#   cube       - cube.build_cube() cells (sums and line counts)
+#   sketches   - optional per-cell HyperLogLog registers for distinct customers
+#   daypart    - revenue by (day_of_week, hour_of_day)
+#   customers  - line count per customer id, for unique-customer and repeat-rate KPIs
+#   order_revenue / order_units - number of orders per order total, for the order histograms
+#   customer_months - orders per (customer id, order_month), for new vs repeat
+#   first_ts / last_ts - order_datetime min/max
+#   rows, datetime_parse - ingestion bookkeeping
+# Per-order fields need each order's lines in one chunk; stream_ingest holds a chunk's last order
+# back for the next one, so orders must be contiguous in the file (as exports list them).
+
+# order revenue is kept to whole AED, so the histogram state grows with the value range, not the order count
+REVENUE_DECIMALS = 0
+
+def partial_state(chunk: pd.DataFrame, col_map: dict, sketch_precision: int = None) -> dict:
+    rev = col_map.get('line_value')
+    cust = col_map.get('customer_id')
+    odt = col_map.get('order_datetime')
+    cube = build_cube(chunk, col_map)
+    sketches = None
+    if sketch_precision and cube is not None:
+        sketches = build_cell_sketches(chunk, col_map, len(cube), sketch_precision)
+    state = {'cube': cube, 'sketches': sketches, 'daypart': None, 'customers': None,
+             'order_revenue': None, 'order_units': None, 'customer_months': None,
+             'first_ts': None, 'last_ts': None, 'rows': len(chunk),
+             'datetime_parse': dict(chunk.attrs.get('datetime_parse') or {})}
+    if rev and {'day_of_week', 'hour_of_day'} <= set(chunk.columns):
+        state['daypart'] = chunk.groupby(['day_of_week', 'hour_of_day'], observed=True)[rev].sum()
+    if cust and cust in chunk.columns:
+        state['customers'] = chunk.groupby(cust, observed=True).size()
+    per = per_order_metrics(chunk, col_map)
+    if per is not None:
+        state['order_revenue'] = per['order_revenue'].round(REVENUE_DECIMALS).value_counts()
+        if 'order_units' in per.columns:
+            state['order_units'] = per['order_units'].value_counts()
+        if cust and {cust, 'order_month'} <= set(per.columns):
+            state['customer_months'] = per.groupby([cust, 'order_month'], observed=True).size()
+    if odt and odt in chunk.columns and chunk[odt].notna().any():
+        state['first_ts'], state['last_ts'] = chunk[odt].min(), chunk[odt].max()
+    return state
+
+def _add(a, b):
+    if a is None or b is None:
+        return b if a is None else a
+    return a.add(b, fill_value=0)
+
+def _pick(a, b, fn):
+    vals = [v for v in (a, b) if v is not None]
+    return fn(vals) if vals else None
+
+def merge_states(a: dict, b: dict, col_map: dict) -> dict:
+    if a is None:
+        return b
+    parse = dict(a['datetime_parse'])
+    for k in ('vectorized', 'fallback', 'unparsed'):
+        parse[k] = parse.get(k, 0) + b['datetime_parse'].get(k, 0)
+    parse['format'] = parse.get('format') or b['datetime_parse'].get('format')
+    cube = merge_cubes([a['cube'], b['cube']], col_map)
+    sketches = None
+    if a['sketches'] is not None and b['sketches'] is not None:
+        sketches = merge_cell_sketches([a['cube'], b['cube']], [a['sketches'], b['sketches']], col_map, len(cube))
+    return {'cube': cube,
+            'sketches': sketches,
+            'daypart': _add(a['daypart'], b['daypart']),
+            'customers': _add(a['customers'], b['customers']),
+            'order_revenue': _add(a['order_revenue'], b['order_revenue']),
+            'order_units': _add(a['order_units'], b['order_units']),
+            'customer_months': _add(a['customer_months'], b['customer_months']),
+            'first_ts': _pick(a['first_ts'], b['first_ts'], min),
+            'last_ts': _pick(a['last_ts'], b['last_ts'], max),
+            'rows': a['rows'] + b['rows'],
+            'datetime_parse': parse}
+
+def stream_ingest(path, metadata_path=None, chunksize: int = 250_000, sketch_precision: int = None):
+    """Chunked load: engineer each chunk, fold it into the running state, drop the rows.
+
+    Returns (state, col_map).
+    """
+    state, col_map, held = None, None, None
+    def fold(state, chunk):
+        chunk = engineer_features(chunk, col_map)
+        return merge_states(state, partial_state(chunk, col_map, sketch_precision), col_map)
+    for chunk in load_typed_csv(path, metadata_path, chunksize=chunksize):
+        chunk = standardize_columns(chunk)
+        if col_map is None:
+            col_map = infer_columns(chunk)
+        if held is not None:
+            chunk = pd.concat([held, chunk], ignore_index=True)
+        oid = col_map.get('order_id') or ('order_id' if 'order_id' in chunk.columns else None)
+        if oid is None:
+            held = None
+        else:
+            # the last order may continue in the next chunk
+            last = chunk[oid].eq(chunk[oid].iloc[-1])
+            held, chunk = chunk[last], chunk[~last]
+        if len(chunk):
+            state = fold(state, chunk)
+    if held is not None and len(held):
+        state = fold(state, held)
+    return state, col_map
+
+def order_histograms(state: dict) -> dict:
+    """{'order_revenue' | 'order_units': (edges, counts)} binned as charts.chart_specs bins them."""
+    out = {}
+    for col, bins in (('order_revenue', 'fd'), ('order_units', 30)):
+        totals = state.get(col)
+        if totals is not None and not totals.empty:
+            edges = histogram_edges(totals.index, bins, weights=totals.to_numpy())
+            out[col] = (edges, histogram_counts(totals.index, edges, weights=totals.to_numpy()))
+    return out
+
+def new_vs_repeat(state: dict):
+    """Monthly summary of utils.new_vs_repeat_by_month from the merged orders per customer and month."""
+    counts = state.get('customer_months')
+    if counts is None or counts.empty:
+        return None
+    per = counts[counts > 0].rename('orders').reset_index()
+    cust = per.columns[0]
+    first = per.groupby(cust, observed=True)['order_month'].transform('min')
+    per['new'] = per['orders'].where(per['order_month'] == first, 0)
+    summary = per.groupby('order_month', observed=True)[['new', 'orders']].sum().reset_index()
+    summary['new_customer_share'] = summary['new'] / summary['orders']
+    summary['orders'] = summary['orders'].astype('int64')
+    return summary[['order_month', 'new_customer_share', 'orders']]
+
+def customer_kpis(state: dict) -> dict:
+    """Unfiltered customer KPIs from the merged per-customer counts."""
+    counts = state.get('customers')
+    if counts is None or counts.empty:
+        return {}
+    return {'Unique Customers': int(len(counts)), 'Repeat Customer Rate': float((counts > 1).mean())}
@@ -0,0 +1,50 @@
+import sys
+from pathlib import Path
+import pytest
+
+# The dashboard modules import each other by bare name (Streamlit runs app.py from this directory).
+PACKAGE_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PACKAGE_DIR))
+
+DATA_DIR = PACKAGE_DIR / "data"
+
+@pytest.fixture(scope="session")
+def sample_csv():
+    return DATA_DIR / "lulu_uae_master_2000.csv"
+
+@pytest.fixture(scope="session")
+def metadata_csv():
+    return DATA_DIR / "lulu_uae_master_metadata.csv"
+
+@pytest.fixture(scope="session")
+def sample_lines(sample_csv):
+    """Header line, then one bytes line per sample row (newlines kept)."""
+    return sample_csv.read_bytes().splitlines(keepends=True)
+
+@pytest.fixture(scope="session")
+def memory_data(sample_csv, metadata_csv, tmp_path_factory):
+    """The pandas in-memory path: dataset.load_dataset() for the sample, without the app config."""
+    from dataset import load_frame, filter_columns
+    from filter_index import build_filter_index
+    from customers import build_customers
+    df, col_map = load_frame(sample_csv, metadata_csv, tmp_path_factory.mktemp("snapshots"))
+    return {'frame': df, 'col_map': col_map, 'customers': build_customers(df, col_map),
+            'filter_index': build_filter_index(df, filter_columns(df, col_map))}
+
+@pytest.fixture(scope="session")
+def pandas_results(memory_data):
+    """selections -> what the pandas path hands to plots.py for them."""
+    from dataset import filter_frame
+    from cube import build_cube
+    from utils import kpis, per_order_metrics, new_vs_repeat_by_month
+    def compute(selections):
+        col_map, customers = memory_data['col_map'], memory_data['customers']
+        rows = filter_frame(memory_data['frame'], memory_data['filter_index'], selections)
+        per = per_order_metrics(rows, col_map)
+        return {'rows': rows,
+                'cube': build_cube(rows, col_map),
+                'daypart': rows.groupby(['day_of_week', 'hour_of_day'], observed=True)[col_map['line_value']].sum().reset_index(),
+                'kpis': kpis(rows, col_map, customers=customers),
+                'per': per,
+                'nvr': new_vs_repeat_by_month(rows, col_map, customers, per=per)}
+    return compute
@@ -0,0 +1,23 @@
+import pandas as pd
+import pytest
+from time_index import DateRange
+
+# Sidebar selections the backends are compared on: none, cube dimensions only, a column outside
+# the cube, and a date range (sample orders run from April to October 2025).
+SELECTIONS = [
+    {},
+    {'city': ['Dubai'], 'channel': ['Online App']},
+    {'brand': ['Nestlé', 'Pepsi']},
+    {'order_datetime': DateRange(pd.Timestamp('2025-06-01'), pd.Timestamp('2025-08-15')), 'gender': ['Female']},
+]
+
+def assert_same_frame(got, want, keys):
+    """Equal values and dtypes, ignoring row order."""
+    def ordered(df):
+        return df.sort_values(keys, key=lambda s: s.astype(str)).reset_index(drop=True)
+    assert list(got.columns) == list(want.columns)
+    pd.testing.assert_frame_equal(ordered(got), ordered(want), check_exact=False)
+
+def assert_same_kpis(got, want):
+    assert got.keys() == want.keys()
+    assert got == pytest.approx(want, nan_ok=True)
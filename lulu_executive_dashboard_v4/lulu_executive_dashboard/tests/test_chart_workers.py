@@ -0,0 +1,34 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+import pytest
+
+pytest.importorskip("streamlit.testing.v1")
+
+APP_DIR = Path(__file__).resolve().parents[1]
+
+# Runs the app once in a fresh interpreter, so plotly's first import happens during the rerun,
+# and prints the chart titles in page order plus any exceptions the page showed.
+RUN_APP = """
+import json
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file("app.py", default_timeout=120).run()
+titles = [json.loads(c.proto.spec)['layout'].get('title', {}).get('text') for c in at.get("plotly_chart")]
+print(json.dumps({'titles': titles, 'errors': [e.value for e in at.exception]}))
+"""
+
+def render_page(workers: int) -> dict:
+    env = dict(os.environ, LULU_CHART_WORKERS=str(workers), LULU_INGEST_MODE="memory")
+    proc = subprocess.run([sys.executable, "-c", RUN_APP], cwd=APP_DIR, env=env,
+                          capture_output=True, text=True, timeout=300)
+    assert proc.returncode == 0, proc.stderr
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+def test_chart_pool_renders_every_chart():
+    serial = render_page(0)
+    assert serial['errors'] == [] and serial['titles']
+    threaded = render_page(8)
+    assert threaded['errors'] == []
+    assert threaded['titles'] == serial['titles']
@@ -0,0 +1,26 @@
+import pytest
+from cube import cube_columns
+from parity import SELECTIONS, assert_same_frame, assert_same_kpis
+
+duck = pytest.importorskip("duckdb_backend")
+if duck.duckdb is None:
+    pytest.skip("duckdb is not installed", allow_module_level=True)
+
+@pytest.fixture(scope="module")
+def db(memory_data):
+    return duck.connect(memory_data['frame'], customers=memory_data['customers'])
+
+@pytest.mark.parametrize("selections", SELECTIONS)
+def test_matches_pandas(db, memory_data, pandas_results, selections):
+    col_map = memory_data['col_map']
+    want = pandas_results(selections)
+    assert len(want['rows'])  # every selection keeps some rows
+    cube = duck.cube(db, col_map, selections)
+    assert_same_frame(cube, want['cube'], cube_columns(want['cube'], col_map))
+    daypart = duck.group_frame(db, ['day_of_week', 'hour_of_day'], col_map['line_value'], selections)
+    assert_same_frame(daypart, want['daypart'], ['day_of_week', 'hour_of_day'])
+    assert_same_kpis(duck.kpis(db, col_map, selections), want['kpis'])
+    assert_same_frame(duck.per_order_metrics(db, col_map, selections), want['per'], ['order_id'])
+    per, summary = duck.new_vs_repeat_by_month(db, col_map, selections)
+    assert_same_frame(per, want['nvr'][0], ['order_id'])
+    assert_same_frame(summary, want['nvr'][1], ['order_month'])
@@ -0,0 +1,34 @@
+import pandas as pd
+import pytest
+from cube import LINE_COUNT, cube_columns
+from planner import aggregate
+from parity import SELECTIONS, assert_same_frame, assert_same_kpis
+
+pb = pytest.importorskip("polars_backend")
+if pb.pl is None:
+    pytest.skip("polars is not installed", allow_module_level=True)
+
+@pytest.fixture(scope="module")
+def db(sample_csv, metadata_csv):
+    return pb.load(sample_csv, metadata_csv)
+
+@pytest.mark.parametrize("selections", SELECTIONS)
+def test_matches_pandas(db, memory_data, pandas_results, selections):
+    col_map = memory_data['col_map']
+    assert db['col_map'] == col_map
+    want = pandas_results(selections)
+    assert len(want['rows'])  # every selection keeps some rows
+    chart_keys = [(col_map['department'],), (col_map['city'], col_map['store_format'])]
+    res = pb.run(db, col_map, selections, chart_keys)
+    assert_same_frame(res['cube'], want['cube'], cube_columns(want['cube'], col_map))
+    assert_same_frame(res['daypart'], want['daypart'], ['day_of_week', 'hour_of_day'])
+    assert_same_kpis(res['kpis'], want['kpis'])
+    assert_same_frame(res['per'], want['per'], ['order_id'])
+    per, summary = res['nvr']
+    assert_same_frame(per, want['nvr'][0], ['order_id'])
+    assert_same_frame(summary, want['nvr'][1], ['order_month'])
+    # what run() primes the planner with is what it would have computed from the cube
+    for keys in chart_keys:
+        for measure in (col_map['line_value'], LINE_COUNT):
+            pd.testing.assert_series_equal(res['aggregates'][(keys, measure, 'sum')],
+                                           aggregate(want['cube'], keys, measure).sort_index(), check_exact=False)
@@ -0,0 +1,17 @@
+import pandas as pd
+import pytest
+from dataset import filter_frame
+from time_index import DateRange, window
+
+def test_reversed_custom_range_is_rejected():
+    last = pd.Timestamp("2025-10-01 18:30")
+    with pytest.raises(ValueError, match="starts after it ends"):
+        window("Custom", last, "2025-09-30", "2025-09-01")
+    assert window("Custom", last, "2025-09-01", "2025-09-01") == DateRange(pd.Timestamp("2025-09-01"), pd.Timestamp("2025-09-02"))
+
+def test_reversed_span_selects_nothing(memory_data):
+    col_map = memory_data['col_map']
+    rng = DateRange(pd.Timestamp("2025-09-30"), pd.Timestamp("2025-09-02"))
+    for selections in ({col_map['order_datetime']: rng},
+                       {col_map['city']: ['Dubai'], col_map['order_datetime']: rng}):
+        assert filter_frame(memory_data['frame'], memory_data['filter_index'], selections).empty
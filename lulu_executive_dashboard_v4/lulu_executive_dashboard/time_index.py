@@ -0,0 +1,66 @@
+from typing import NamedTuple
+import numpy as np
+import pandas as pd
+
+# Date-range filtering on a frame sorted once by order_datetime at load time (sort_by_time).
+# A range is then a contiguous block of rows found with two binary searches, i.e. a slice view
+# rather than a boolean scan, and the sidebar's bitmaps are only read for that block.
+# In selections the range sits under the datetime column as a DateRange instead of a label list;
+# filter_index, the cube check and both SQL/polars backends recognise it.
+
+class DateRange(NamedTuple):
+    start: pd.Timestamp  # inclusive
+    stop: pd.Timestamp   # exclusive
+
+# Sidebar windows, anchored on the last order date in the data.
+WINDOWS = ["All time", "Last 7 days", "Month to date", "Quarter to date", "Previous quarter", "Custom"]
+
+def sort_by_time(df: pd.DataFrame, col: str) -> pd.DataFrame:
+    """df in order_datetime order (NaT last) with a fresh RangeIndex; returned as-is if already sorted."""
+    if not col or col not in df.columns:
+        return df
+    values = df[col].to_numpy()
+    # numpy sorts NaT after every date, which is also where searchsorted expects it
+    order = np.argsort(values, kind='stable')
+    if (order == np.arange(len(order))).all():
+        return df
+    out = df.take(order).reset_index(drop=True)
+    out.attrs = df.attrs
+    return out
+
+def row_span(df: pd.DataFrame, col: str, rng: DateRange) -> tuple:
+    """(lo, hi) such that rows lo..hi-1 of the time-sorted df fall in rng."""
+    values = df[col].to_numpy()
+    bounds = np.array([rng.start.to_datetime64(), rng.stop.to_datetime64()]).astype(values.dtype)
+    lo, hi = np.searchsorted(values, bounds)
+    # a range that stops before it starts is empty, not a negative span
+    return int(lo), int(max(lo, hi))
+
+def date_bounds(df: pd.DataFrame, col: str) -> tuple:
+    """First and last order timestamps; NaT rows sort last, so these are the first row and the last dated one."""
+    s = df[col]
+    n = int(s.notna().sum())
+    return (s.iloc[0], s.iloc[n - 1]) if n else (None, None)
+
+def window(name: str, last: pd.Timestamp, start=None, end=None):
+    """DateRange for a sidebar window ending on the day of `last`; None for all time.
+    "Custom" takes inclusive start/end dates."""
+    day = pd.Timestamp(last).normalize()
+    stop = day + pd.Timedelta(days=1)
+    if name == "All time":
+        return None
+    if name == "Last 7 days":
+        return DateRange(stop - pd.Timedelta(days=7), stop)
+    if name == "Month to date":
+        return DateRange(day.replace(day=1), stop)
+    if name == "Quarter to date":
+        return DateRange(day.to_period('Q').start_time, stop)
+    if name == "Previous quarter":
+        q = day.to_period('Q') - 1
+        return DateRange(q.start_time, (q + 1).start_time)
+    if name == "Custom":
+        first, final = pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize()
+        if first > final:
+            raise ValueError(f"Date range starts after it ends ({first.date()} > {final.date()}).")
+        return DateRange(first, final + pd.Timedelta(days=1))
+    raise ValueError(f"Unknown date window '{name}'; use one of {WINDOWS}.")
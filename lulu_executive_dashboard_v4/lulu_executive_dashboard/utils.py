@@ -1,7 +1,57 @@
 
 import pandas as pd
-import numpy as np
-from dateutil import parser
+from pathlib import Path
+from cube import LINE_COUNT
+from planner import aggregate
+from customers import lookup_kpis, first_months
+
+def read_schema(metadata_path) -> dict:
+    """Map column -> declared kind ('category', 'flag', 'int', 'float', 'string', 'datetime') from the metadata CSV."""
+    meta = pd.read_csv(metadata_path)
+    schema = {}
+    for col, dtype in zip(meta['column'].str.strip(), meta['dtype'].astype(str).str.strip().str.lower()):
+        if dtype.startswith('int (0/1)'):
+            schema[col] = 'flag'
+        elif dtype.startswith(('category', 'int', 'float', 'datetime')):
+            schema[col] = dtype.split()[0]
+        else:
+            schema[col] = 'string'
+    return schema
+
+def downcast_numeric(s: pd.Series, kind: str) -> pd.Series:
+    """Shrink a numeric column only when no value changes."""
+    s = pd.to_numeric(s, errors='coerce')
+    if s.isna().any():
+        return s if kind != 'float' else s.astype('float64')
+    if kind == 'flag':
+        return s.astype('int8') if s.isin([0, 1]).all() else pd.to_numeric(s, downcast='integer')
+    if kind == 'int':
+        return pd.to_numeric(s, downcast='integer')
+    small = s.astype('float32')
+    return small if (small.astype('float64') == s).all() else s
+
+def apply_schema(df: pd.DataFrame, schema: dict) -> pd.DataFrame:
+    for c in df.columns:
+        kind = schema.get(c.strip())
+        if kind in ('flag', 'int', 'float') and df[c].dtype.kind in 'biuf':
+            df[c] = downcast_numeric(df[c], kind)
+    return df
+
+def load_typed_csv(path, metadata_path=None, **read_kwargs):
+    """read_csv with the metadata schema applied: categoricals for dimensions, downcast numerics.
+
+    With `chunksize` in read_kwargs, returns a generator of typed chunks instead of one frame.
+    """
+    if metadata_path is None or not Path(metadata_path).exists():
+        return pd.read_csv(path, **read_kwargs)
+    schema = read_schema(metadata_path)
+    header = pd.read_csv(path, nrows=0).columns
+    if hasattr(path, 'seek'):
+        path.seek(0)
+    reader = pd.read_csv(path, dtype={c: 'category' for c in header if schema.get(c.strip()) == 'category'}, **read_kwargs)
+    if isinstance(reader, pd.DataFrame):
+        return apply_schema(reader, schema)
+    return (apply_schema(chunk, schema) for chunk in reader)
 
 def standardize_columns(df: pd.DataFrame) -> pd.DataFrame:
     # Strip and lower columns
@@ -20,7 +70,7 @@ def infer_columns(df: pd.DataFrame) -> dict:
         return None
     col_map = {}
     col_map['order_datetime'] = find([r'(order[_\s-]?datetime|order[_\s-]?date|txn[_\s-]?date|date)'])
-    col_map['customer_id'] = find([r'(customer[_\s-]?id|cust[_\s-]?id|customer)'])
+    col_map['customer_id'] = find([r'(customer[_\s-]?id|cust[_\s-]?id|customer|user[_\s-]?id)'])
     col_map['gender'] = find([r'(gender|sex)'])
     col_map['age'] = find([r'(age|age[_\s-]?years)'])
     col_map['age_group'] = find([r'(age[_\s-]?group|agegroup)'])
@@ -37,24 +87,94 @@ def infer_columns(df: pd.DataFrame) -> dict:
     col_map['channel'] = find([r'(channel)'])
     col_map['payment'] = find([r'(payment|tender|method)'])
     col_map['nationality_group'] = find([r'(nationality[_\s-]?group|nationality)'])
+    col_map['loyalty'] = find([r'(loyalty[_\s-]?member|loyalty[_\s-]?flag|loyalty)'])
     return col_map
 
+DATETIME_FORMATS = ['%m/%d/%Y %H:%M', '%m/%d/%Y %H:%M:%S', '%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%dT%H:%M:%S',
+                    '%d/%m/%Y %H:%M', '%d/%m/%Y %H:%M:%S', '%m/%d/%Y', '%d/%m/%Y', '%Y-%m-%d']
+
+# a UTC offset after the time of day ('13:45:12+04:00', '13:45Z'); the time is kept, the offset dropped
+UTC_OFFSET = r'(\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?)\s*(?:Z|UTC|[+-]\d{2}:?\d{2})$'
+
+def candidate_formats(sample: pd.Series, guesses: int = 20) -> list:
+    """DATETIME_FORMATS plus whatever pandas guesses from the first few sample values."""
+    import warnings
+    from pandas.tseries.api import guess_datetime_format
+    extra = []
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')  # dayfirst=True warns on strings where it cannot apply
+        for value in sample.iloc[:guesses]:
+            for dayfirst in (False, True):
+                fmt = guess_datetime_format(value, dayfirst=dayfirst)
+                if fmt and fmt not in DATETIME_FORMATS and fmt not in extra:
+                    extra.append(fmt)
+    return DATETIME_FORMATS + extra
+
+def infer_datetime_format(s: pd.Series, sample_size: int = 500):
+    """Pick the format that parses the most of a sample of non-null values (None if nothing fits)."""
+    sample = s.dropna().astype(str)
+    sample = sample.sample(min(sample_size, len(sample)), random_state=0) if len(sample) else sample
+    if sample.empty:
+        return None
+    best, best_hits = None, 0
+    for fmt in candidate_formats(sample):
+        hits = pd.to_datetime(sample, format=fmt, errors='coerce').notna().sum()
+        if hits > best_hits:
+            best, best_hits = fmt, hits
+    return best
+
+def parse_datetimes(s: pd.Series):
+    """Vectorized parse on the inferred format; only non-matching rows fall back to dateutil.
+
+    When no format fits, pandas' ISO 8601 parser is tried before dateutil. UTC offsets are
+    dropped, so times stay as written (store-local) and the result is always naive datetime64.
+    Returns (parsed_series, stats) where stats counts rows handled by each path.
+    """
+    import re
+    if any(re.search(UTC_OFFSET, x) for x in s.dropna().iloc[:500].astype(str)):
+        s = s.str.replace(UTC_OFFSET, r'\1', regex=True)
+    fmt = infer_datetime_format(s)
+    if fmt is None:
+        fmt = 'ISO8601'
+    out = pd.to_datetime(s, format=fmt, errors='coerce')
+    if out.dt.tz is not None:
+        out = out.dt.tz_localize(None)
+    failed = out.isna() & s.notna()
+    stats = {'format': fmt, 'vectorized': int(out.notna().sum()), 'fallback': int(failed.sum()), 'unparsed': 0}
+    if failed.any():
+        # slow path: one dateutil call per distinct string, not per row
+        from dateutil import parser  # only needed when the vectorized parse misses rows
+        def _parse(x):
+            try:
+                return parser.parse(x).replace(tzinfo=None)
+            except (ValueError, OverflowError):
+                return pd.NaT
+        raw = s[failed].astype(str)
+        cache = {x: _parse(x) for x in raw.unique()}
+        out = out.mask(failed, pd.to_datetime(raw.map(cache), errors='coerce'))
+        stats['unparsed'] = int(out[failed].isna().sum())
+    return out, stats
+
 def engineer_features(df: pd.DataFrame, col_map: dict) -> pd.DataFrame:
     df = df.copy()
     odt = col_map.get('order_datetime')
     if odt is not None:
-        try:
-            df[odt] = pd.to_datetime(df[odt])
-        except Exception:
-            # best-effort parse
-            df[odt] = df[odt].apply(lambda x: parser.parse(str(x)) if pd.notnull(x) else pd.NaT)
+        if pd.api.types.is_datetime64_any_dtype(df[odt]):
+            stats = {'format': None, 'vectorized': int(df[odt].notna().sum()), 'fallback': 0, 'unparsed': 0}
+        else:
+            df[odt], stats = parse_datetimes(df[odt])
+        df.attrs['datetime_parse'] = stats
         df['order_date'] = df[odt].dt.date
         df['order_month'] = df[odt].dt.to_period('M').astype(str)
-        df['day_of_week'] = df[odt].dt.day_name()
+        df['day_of_week'] = df[odt].dt.day_name().astype('category')
         df['hour_of_day'] = df[odt].dt.hour
+    # categorical ids: their codes address the customer dimension (customers.py) directly
+    cust = col_map.get('customer_id')
+    if cust in df.columns and not isinstance(df[cust].dtype, pd.CategoricalDtype):
+        df[cust] = df[cust].astype('category')
     # revenue fallback
     rev = col_map.get('line_value')
-    if rev is None:
+    if rev is None or rev not in df.columns:
         q = col_map.get('quantity'); p = col_map.get('unit_price'); d = col_map.get('discount')
         if q and p:
             df['line_value'] = df[q].astype(float) * df[p].astype(float)
@@ -63,33 +183,53 @@ def engineer_features(df: pd.DataFrame, col_map: dict) -> pd.DataFrame:
             col_map['line_value'] = 'line_value'
     # age group
     ag = col_map.get('age_group'); a = col_map.get('age')
-    if ag is None and a is not None:
+    if (ag is None or ag not in df.columns) and a is not None:
         bins = [0,17,24,34,44,54,64,120]
         labels = ['<18','18-24','25-34','35-44','45-54','55-64','65+']
         df['age_group'] = pd.cut(df[a].astype(float), bins=bins, labels=labels, right=True, include_lowest=True)
         col_map['age_group'] = 'age_group'
     return df
 
-def kpis(df: pd.DataFrame, col_map: dict) -> dict:
+def kpis(df: pd.DataFrame, col_map: dict, rows: pd.DataFrame = None, distinct_customers: float = None,
+         customers: pd.DataFrame = None) -> dict:
+    """Headline KPIs. df may be line-level rows or a cube (see cube.build_cube); customer
+    metrics are not additive, so with a cube they come from the line-level `rows`.
+    distinct_customers, when given (e.g. a sketch estimate), replaces the exact nunique().
+    With the customer dimension, the repeat rate is the share of these customers with more than
+    one order overall, looked up rather than regrouped."""
     revenue_col = col_map.get('line_value')
     quantity_col = col_map.get('quantity')
     cust_col = col_map.get('customer_id')
+    lines = float(df[LINE_COUNT].sum()) if LINE_COUNT in df.columns else None
+    def mean(col):
+        if lines is None:
+            return float(df[col].mean())
+        return float(df[col].sum()) / lines if lines else float('nan')
     k = {}
     if revenue_col:
         k['Total Revenue (AED)'] = float(df[revenue_col].sum())
-        k['Avg Order Value (AED)'] = float(df[revenue_col].mean())
+        k['Avg Order Value (AED)'] = mean(revenue_col)
     if quantity_col:
         k['Total Units Sold'] = float(df[quantity_col].sum())
-        k['Avg Units per Order'] = float(df[quantity_col].mean())
-    if cust_col:
-        k['Unique Customers'] = int(df[cust_col].nunique())
+        k['Avg Units per Order'] = mean(quantity_col)
+    rows = df if rows is None else rows
+    if distinct_customers is not None:
+        k['Unique Customers'] = int(round(distinct_customers))
+    if cust_col and cust_col in rows.columns and customers is not None:
+        looked_up = lookup_kpis(customers, rows[cust_col])
+        if distinct_customers is None:
+            k['Unique Customers'] = looked_up['Unique Customers']
+        k['Repeat Customer Rate'] = looked_up['Repeat Customer Rate']
+    elif cust_col and cust_col in rows.columns:
+        if distinct_customers is None:
+            k['Unique Customers'] = int(rows[cust_col].nunique())
         # simple repeat-rate proxy: customers appearing >1 times
-        rc = (df.groupby(cust_col).size()>1).mean()
+        rc = (rows.groupby(cust_col, observed=True).size()>1).mean()
         k['Repeat Customer Rate'] = float(rc)
     return k
 
-def explain_lift(df: pd.DataFrame, group_col: str, value_col: str) -> str:
-    g = df.groupby(group_col)[value_col].sum().sort_values(ascending=False)
+def explain_lift(df: pd.DataFrame, group_col: str, value_col: str, planner=None) -> str:
+    g = aggregate(df, group_col, value_col, planner=planner).sort_values(ascending=False)
     if g.empty:
         return "No data available for this breakdown."
     top = g.index[0]; top_val = g.iloc[0]; total = g.sum()
@@ -100,7 +240,7 @@ def outcome_sentence(context: str, action: str) -> str:
     return f"**Business outcome idea:** {action} (Context: {context})."
 
 def compare_two_groups(df: pd.DataFrame, group_col: str, value_col: str):
-    g = df.groupby(group_col)[value_col].sum().sort_values(ascending=False)
+    g = df.groupby(group_col, observed=True)[value_col].sum().sort_values(ascending=False)
     if len(g)>=2:
         rel = g.iloc[0]/max(g.iloc[1], 1e-9)
         return f"{g.index[0]} outperforms {g.index[1]} by {rel:.2f}× on {value_col}."
@@ -125,20 +265,25 @@ def per_order_metrics(df: pd.DataFrame, col_map: dict):
     if cust: gcols.append(cust)
     agg = {rev:'sum'}
     if qty: agg[qty] = 'sum'
-    per = df.groupby(gcols).agg(agg).reset_index()
+    per = df.groupby(gcols, observed=True).agg(agg).reset_index()
     per = per.rename(columns={rev:'order_revenue'} | ({qty:'order_units'} if qty else {}))
     return per
 
-def new_vs_repeat_by_month(df: pd.DataFrame, col_map: dict):
-    """Compute new vs repeat customer share by month based on first purchase month."""
-    per = per_order_metrics(df, col_map)
+def new_vs_repeat_by_month(df: pd.DataFrame, col_map: dict, customers: pd.DataFrame = None, per: pd.DataFrame = None):
+    """Compute new vs repeat customer share by month based on first purchase month.
+    The first month comes from the customer dimension when given, else from these rows;
+    per is an already computed per_order_metrics(df)."""
+    per = per_order_metrics(df, col_map) if per is None else per.copy()
     cust = col_map.get('customer_id')
     if per is None or cust is None or 'order_month' not in df.columns:
         return None
-    # first month per customer
-    first = per.groupby(cust)['order_month'].min().rename('first_month')
-    per = per.merge(first, on=cust, how='left')
+    if customers is not None:
+        per['first_month'] = first_months(customers, per[cust])
+    else:
+        # first month per customer
+        first = per.groupby(cust, observed=True)['order_month'].min().rename('first_month')
+        per = per.merge(first, on=cust, how='left')
     per['is_new'] = (per['order_month'] == per['first_month']).astype(int)
-    summary = per.groupby(['order_month'])['is_new'].agg(['mean','count']).reset_index()
+    summary = per.groupby(['order_month'], observed=True)['is_new'].agg(['mean','count']).reset_index()
     summary = summary.rename(columns={'mean':'new_customer_share','count':'orders'})
     return per, summary
@@ -0,0 +1,144 @@
+import ast
+import importlib
+import subprocess
+import sys
+import time
+from pathlib import Path
+from filter_index import build_filter_index
+from cube import build_cube, build_cell_sketches, cube_columns
+from customers import build_customers
+from dataset import DATA_DIR, SOURCE, METADATA_FILE_NAME, SNAPSHOT_DIR, STORE_DIR, load_frame, filter_columns
+from config import INGEST_MODE, SKETCH_MODE, HLL_PRECISION, BACKEND
+
+# Cold start: the app defers plotly and the backend engines until first use; this module loads
+# them, plus the engineered frame, filter index, cube and customer dimension, before the first
+# session connects.
+#   python warmup.py serve [--port 8501]   preload, then start Streamlit in this process
+#   python warmup.py report [--top 15]     modules that dominate import time
+# The app's loaders check warmed() first, so the first session reuses what preload() built.
+
+BASE_DIR = Path(__file__).parent
+APP = BASE_DIR / "app.py"
+# Imported lazily by the app; loaded here so the first chart does not pay for them.
+DEFERRED = ['plotly.express', 'plotly.graph_objects', 'plotly.io']
+BACKENDS = {'duckdb': 'duckdb_backend', 'polars': 'polars_backend'}
+
+# name -> (source signature, value); shared with the app, which runs in the same process.
+_WARM = {}
+
+def _signature(src) -> tuple:
+    stat = Path(src).stat()
+    return str(Path(src).resolve()), stat.st_size, stat.st_mtime_ns
+
+def warmed(name: str, src):
+    """Value preloaded under name for this source, or None if absent or the source has changed."""
+    entry = _WARM.get(name)
+    if entry is None or entry[0] != _signature(src):
+        return None
+    return entry[1]
+
+def import_deferred() -> list:
+    """Import the modules the app defers (no-op for ones already loaded)."""
+    return [importlib.import_module(m) for m in DEFERRED]
+
+def preload(src=SOURCE, log=print) -> dict:
+    """Import deferred modules and build the data structures the first session needs; returns seconds per step."""
+    timings = {}
+    def step(name, fn):
+        t = time.perf_counter()
+        out = fn()
+        timings[name] = time.perf_counter() - t
+        log(f"warmup {name:<14}{timings[name] * 1000:>9.1f} ms")
+        return out
+
+    backend = [BACKENDS[BACKEND]] if BACKEND in BACKENDS else []
+    step('imports', lambda: import_deferred() + [importlib.import_module(m) for m in backend])
+    if INGEST_MODE == "incremental":
+        from incremental import refresh
+        # brings the Parquet store up to date so the first session only reads it back
+        step('store', lambda: refresh(DATA_DIR, STORE_DIR, METADATA_FILE_NAME, HLL_PRECISION if SKETCH_MODE else None))
+        return timings
+    if INGEST_MODE != "memory":
+        return timings
+    df, col_map = step('frame', lambda: load_frame(src, src.with_name(METADATA_FILE_NAME), SNAPSHOT_DIR))
+    _WARM['data'] = (_signature(src), (df, col_map))
+    index = step('filter_index', lambda: build_filter_index(df, filter_columns(df, col_map)))
+    _WARM['filter_index'] = (_signature(src), index)
+
+    def cube():
+        c = build_cube(df, col_map)
+        if c is None:
+            return None, None, None
+        sketches = build_cell_sketches(df, col_map, len(c), HLL_PRECISION) if SKETCH_MODE else None
+        return c, build_filter_index(c, cube_columns(c, col_map)), sketches
+    _WARM['cube'] = (_signature(src), step('cube', cube))
+    _WARM['customers'] = (_signature(src), step('customers', lambda: build_customers(df, col_map)))
+    return timings
+
+def app_imports(path=APP) -> list:
+    """Top-level modules the app script imports at module level."""
+    names = []
+    for node in ast.parse(Path(path).read_text(encoding='utf-8')).body:
+        if isinstance(node, ast.Import):
+            names += [a.name for a in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.level == 0:
+            names.append(node.module)
+    return list(dict.fromkeys(names))
+
+def import_times(modules) -> list:
+    """(module, self_us, cumulative_us, depth) from `python -X importtime` in a fresh interpreter."""
+    code = "; ".join(f"import {m}" for m in modules)
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=BASE_DIR,
+                          capture_output=True, text=True, check=True)
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cum_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cum_us), depth))
+    return rows
+
+def import_report(top: int = 15) -> str:
+    """Startup imports of the app versus the deferred ones, each with its heaviest top-level modules."""
+    eager = app_imports()
+    deferred = DEFERRED + ([BACKENDS[BACKEND]] if BACKEND in BACKENDS else [])
+    rows = import_times(eager + deferred)
+    # importtime prints each module once, when it is first imported; the eager ones run first
+    first_deferred = next((i for i, r in enumerate(rows) if r[3] == 0 and r[0] in deferred), len(rows))
+    lines = []
+    for title, part in (("startup (app.py module level)", rows[:first_deferred]),
+                        ("deferred (first chart / backend)", rows[first_deferred:])):
+        roots = sorted((r for r in part if r[3] == 0), key=lambda r: -r[2])
+        lines.append(f"{title}: {sum(r[2] for r in roots) / 1000:,.0f} ms")
+        lines += [f"  {name:<40}{cum / 1000:>9.1f} ms" for name, _, cum, _ in roots[:top]]
+    heavy = sorted(rows, key=lambda r: -r[1])[:top]
+    lines.append("largest self time:")
+    lines += [f"  {name:<40}{s / 1000:>9.1f} ms" for name, s, _, _ in heavy]
+    return "\n".join(lines)
+
+def serve(port: int = None, args=()):
+    """Preload, then run the dashboard with Streamlit in this process so sessions see the warm state."""
+    from streamlit.web import bootstrap
+    t = time.perf_counter()
+    preload()
+    print(f"warmup done in {time.perf_counter() - t:.2f}s")
+    flags = {'server_port': port} if port else {}
+    bootstrap.load_config_options(flag_options=flags)
+    bootstrap.run(str(APP), False, list(args), flags)
+
+if __name__ == "__main__":
+    import argparse
+    import warmup  # run through the importable module so the app sees the same _WARM
+    ap = argparse.ArgumentParser(description="Cold-start helpers for the dashboard.")
+    sub = ap.add_subparsers(dest="command", required=True)
+    s = sub.add_parser("serve", help="preload data and deferred imports, then start the app")
+    s.add_argument("--port", type=int, default=None)
+    s.add_argument("app_args", nargs=argparse.REMAINDER, help="arguments passed to the app script")
+    r = sub.add_parser("report", help="list the modules that dominate startup import time")
+    r.add_argument("--top", type=int, default=15)
+    args = ap.parse_args()
+    if args.command == "serve":
+        warmup.serve(args.port, args.app_args)
+    else:
+        print(warmup.import_report(args.top))